@@ -0,0 +1,72 @@
+# benchmarks/ble_throughput.py
+# Web Bluetooth chat transport over an emulated BLE link (ble_transport.LoopbackLink):
+# the original one writeValue() per message, versus fragments written with
+# response one at a time, versus fragments pipelined with writeValueWithoutResponse
+# and a credit window.
+# Run from the repo root with: python -m benchmarks.ble_throughput [--latency 0.00375]
+#
+# Time is from the first write to the receiver reassembling the message, in
+# real time on the asyncio loop. Sizes are chat text; what goes on the link is
+# IV + ciphertext + tag (28 bytes more), as sent by the page.
+
+import argparse
+import asyncio
+import os
+import time
+
+from ble_transport import LoopbackLink, Reassembler, fragment, send_message
+
+MTUS = (23, 185, 247, 517)
+SIZES = (64, 1024, 4000)  # 4000 is near the 256-fragment limit at MTU 23
+WINDOWS = (0, 4)
+GCM_OVERHEAD = 12 + 16
+
+
+async def measure(mtu, data, window, latency):
+    done = asyncio.get_running_loop().create_future()
+    reassembler = Reassembler()
+
+    def on_value(value):
+        if window is None:
+            done.set_result(None)
+        elif reassembler.feed(value) is not None:
+            done.set_result(None)
+
+    link = LoopbackLink(on_value, mtu=mtu, latency=latency)
+    start = time.perf_counter()
+    if window is None:
+        await link.write_with_response(data)  # the original page: whole message, one write
+    else:
+        await send_message(link, data, 0, window)
+    await done
+    return time.perf_counter() - start
+
+
+async def run(latency):
+    print(f"one-way latency {latency * 1000:.2f} ms, 1M PHY")
+    print(f"{'mtu':>4} {'text B':>7} {'frags':>5} {'mode':<22} {'ms':>8} {'KiB/s':>8}")
+    for mtu in MTUS:
+        for size in SIZES:
+            data = os.urandom(size + GCM_OVERHEAD)
+            frags = len(fragment(data, 0, mtu))
+            for window in (None, *WINDOWS):
+                mode = "writeValue (original)" if window is None else \
+                    "fragments, response" if window == 0 else f"pipelined, window {window}"
+                try:
+                    elapsed = await measure(mtu, data, window, latency)
+                except ValueError:
+                    print(f"{mtu:>4} {size:>7} {frags:>5} {mode:<22} {'fails: value exceeds MTU':>17}")
+                    continue
+                print(f"{mtu:>4} {size:>7} {frags:>5} {mode:<22} {elapsed * 1000:>8.1f} "
+                      f"{len(data) / 1024 / elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.00375, help="one-way seconds (half a 7.5 ms interval)")
+    opts = parser.parse_args()
+    asyncio.run(run(opts.latency))
+
+
+if __name__ == "__main__":
+    main()
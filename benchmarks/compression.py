@@ -0,0 +1,80 @@
+# benchmarks/compression.py
+# Bytes on the wire and end-to-end latency of chat frames with and without
+# threshold deflate (frame_codec.compress_payload, FLAG_DEFLATE).
+# Run from the repo root with: python -m benchmarks.compression  (needs cryptography)
+#
+# The corpus mixes short chat lines with the large pastes that motivated
+# compression: a log excerpt, a traceback, source code and JSON. Latency is
+# seal + open (including deflate/inflate) measured here, plus the time the
+# frame takes on a link of the given upstream rate.
+
+import inspect
+import json
+import time
+import traceback
+
+import lan_server
+from frame_codec import COMPRESS_MIN, derive_key, open_frame, seal
+
+REPEATS = 200
+LINKS_MBIT = (1, 20)
+
+
+def traceback_text():
+    def parse(row):
+        return int(row["count"])
+
+    try:
+        [parse(row) for row in ({"count": "3"}, {"count": "three"})]
+    except ValueError:
+        return traceback.format_exc()
+
+
+def corpus():
+    log = "\n".join(
+        f"2024-05-0{i % 9 + 1} 12:{i % 60:02d}:{(7 * i) % 60:02d} INFO  lan_server  "
+        f"Connected to 192.168.1.{i % 250}:{50000 + i}, {i % 7} clients, outbuf {(i * 37) % 4096} bytes"
+        for i in range(120)
+    )
+    data = json.dumps(
+        [{"id": i, "user": f"user{i}", "room": "lobby", "ts": 1717000000 + i, "text": "hello there", "read": i % 3 == 0}
+         for i in range(80)],
+        indent=2,
+    )
+    return [
+        ("short line", "ok"),
+        ("chat line", "see you at 5? I'll bring the charger"),
+        ("emoji line", "🎉🎉 congrats!! 🚀 let's go 🙌"),
+        ("url", "https://github.com/Amankumar-004/Random-Programs-testing/blob/main/README.md#lan-chat"),
+        ("paragraph", "The build broke again after the last merge. " * 12),
+        ("traceback", traceback_text()),
+        ("source code", inspect.getsource(lan_server)),
+        ("log excerpt", log),
+        ("json", data),
+    ]
+
+
+def bench(key, payload, compress):
+    frame = seal(key, payload, 0, compress=compress)
+    start = time.perf_counter()
+    for seq in range(REPEATS):
+        open_frame(key, seal(key, payload, seq, compress=compress))
+    return len(frame), (time.perf_counter() - start) / REPEATS
+
+
+def main():
+    key = derive_key("benchmark")
+    links = " ".join(f"{f'{rate} Mbit/s us':>15}" for rate in LINKS_MBIT)
+    print(f"threshold {COMPRESS_MIN} B; wire = frame bytes; link columns are codec + transmission time")
+    print(f"{'payload':<12} {'bytes':>7} {'mode':>7} {'wire':>7} {'codec us':>9} {links}")
+    for name, text in corpus():
+        payload = text.encode()
+        for compress in (False, True):
+            wire, codec = bench(key, payload, compress)
+            e2e = " ".join(f"{(codec + wire * 8 / (rate * 1e6)) * 1e6:>15.0f}" for rate in LINKS_MBIT)
+            mode = "deflate" if compress else "raw"
+            print(f"{name:<12} {len(payload):>7} {mode:>7} {wire:>7} {codec * 1e6:>9.1f} {e2e}")
+
+
+if __name__ == "__main__":
+    main()
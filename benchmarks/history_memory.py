@@ -0,0 +1,57 @@
+# benchmarks/history_memory.py
+# Memory held by the LAN chat history after N messages: the original unbounded
+# list of (sender, msg) tuples versus chat_history.ChatHistory (500-record ring
+# with SQLite spill), plus the cost of fetching one page.
+# Run from the repo root with: python -m benchmarks.history_memory
+
+import time
+import tracemalloc
+
+from chat_history import ChatHistory
+
+COUNTS = (10_000, 100_000, 500_000)
+
+
+def message(i):
+    return ("peer" if i % 2 else "me"), f"message number {i} with some ordinary chat text"
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, elapsed
+
+
+def build_list(n):
+    messages = []
+    for i in range(n):
+        messages.append(message(i))
+    return messages
+
+
+def build_history(n):
+    history = ChatHistory()
+    for i in range(n):
+        history.append(*message(i))
+    return history
+
+
+def main():
+    print(f"{'messages':>9} {'list MiB':>9} {'history MiB':>12} {'append us':>10} {'oldest page ms':>15}")
+    for n in COUNTS:
+        _, list_bytes, _ = measure(lambda: build_list(n))
+        history, hist_bytes, elapsed = measure(lambda: build_history(n))
+        start = time.perf_counter()
+        history.page(history.page_count(50) - 1, 50)
+        page_ms = (time.perf_counter() - start) * 1000
+        print(f"{n:>9} {list_bytes / 2**20:>9.2f} {hist_bytes / 2**20:>12.2f} "
+              f"{elapsed / n * 1e6:>10.2f} {page_ms:>15.2f}")
+        history.close()  # also deletes the temporary database
+
+
+if __name__ == "__main__":
+    main()
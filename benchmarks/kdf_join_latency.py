@@ -0,0 +1,55 @@
+# benchmarks/kdf_join_latency.py
+# CPU cost of key derivation per join: PBKDF2 on every Host/Join click versus
+# the per-(password, salt) key cache in p2p_component/frontend/crypto.js.
+# Run from the repo root with: python -m benchmarks.kdf_join_latency
+#
+# This is a proxy, not join latency: it runs hashlib's PBKDF2-HMAC-SHA256 in
+# this process, so it shows how much work a join costs and what the cache
+# saves, but not whether that work blocks the page. The browser derives keys
+# with WebCrypto in a Web Worker (kdf-worker.js); for the latency a user
+# actually sees, run `python -m benchmarks.ttfm` and read its "key" phase, or
+# the chat status line ("key ready after N ms").
+
+import hashlib
+import statistics
+import time
+
+PASSWORD = b"correct horse battery staple"
+RUNS = 5
+
+
+def time_pbkdf2(salt, iterations):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", PASSWORD, salt, iterations, dklen=32)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_cached(salt, iterations):
+    cache = {}
+    cache_id = hashlib.sha256(salt + b"\0" + PASSWORD).hexdigest()
+    cache[cache_id] = hashlib.pbkdf2_hmac("sha256", PASSWORD, salt, iterations, dklen=32)
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        cache[hashlib.sha256(salt + b"\0" + PASSWORD).hexdigest()]
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    print("PBKDF2 CPU time in Python (proxy for the work per join, not browser join latency)")
+    print(f"{'variant':<28} {'iterations':>10} {'uncached ms':>12} {'cached ms':>10}")
+    for name, salt, iterations in (
+        ("chat apps (p2p-chat)", b"p2p-chat", 50000),
+        ("Web Bluetooth", b"bluetooth-chat-salt", 100000),
+    ):
+        cold = time_pbkdf2(salt, iterations)
+        warm = time_cached(salt, iterations)
+        print(f"{name:<28} {iterations:>10} {cold:>12.1f} {warm:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/lan_crypto.py
+# Cost of AES-GCM sealing for the LAN chat (frame_codec.FrameCipher).
+# Run from the repo root with: python -m benchmarks.lan_crypto  (needs cryptography)
+#
+# Three ways to seal and open the same messages:
+#   per message  frame_codec.seal()/open_frame(), a new AESGCM for every frame
+#   cached       one FrameCipher, seal()/open() per frame
+#   batch        one FrameCipher, seal_many()/open_many() BATCH frames per call
+# MB/s counts plaintext bytes. "us/msg" is seal + open of one message, which
+# for 64 B messages is almost all fixed per-message cost. Every frame adds
+# HEADER_SIZE + TAG_SIZE bytes on the wire.
+
+import time
+
+from frame_codec import HEADER_SIZE, TAG_SIZE, FrameCipher, derive_key, open_frame, seal
+
+SIZES = (64, 64 * 1024)
+TOTAL_BYTES = 64 * 1024 * 1024
+MIN_MESSAGES = 20000
+BATCH = 64
+
+
+def per_message(key, payloads):
+    start = time.perf_counter()
+    frames = [seal(key, p, seq) for seq, p in enumerate(payloads)]
+    sealed = time.perf_counter()
+    for frame in frames:
+        open_frame(key, frame)
+    return sealed - start, time.perf_counter() - sealed
+
+
+def cached(key, payloads):
+    cipher = FrameCipher(key)
+    start = time.perf_counter()
+    frames = [cipher.seal(p) for p in payloads]
+    sealed = time.perf_counter()
+    for frame in frames:
+        cipher.open(frame)
+    return sealed - start, time.perf_counter() - sealed
+
+
+def batch(key, payloads):
+    cipher = FrameCipher(key)
+    start = time.perf_counter()
+    frames = []
+    for i in range(0, len(payloads), BATCH):
+        frames += cipher.seal_many(payloads[i:i + BATCH])
+    sealed = time.perf_counter()
+    for i in range(0, len(frames), BATCH):
+        cipher.open_many(frames[i:i + BATCH])
+    return sealed - start, time.perf_counter() - sealed
+
+
+def main():
+    key = derive_key("benchmark")
+    overhead = HEADER_SIZE + TAG_SIZE
+    print(f"{'size':>7} {'mode':<12} {'seal MB/s':>10} {'open MB/s':>10} {'us/msg':>8} {'wire':>7}")
+    for size in SIZES:
+        count = max(MIN_MESSAGES, TOTAL_BYTES // size)
+        payloads = [bytes([i % 251]) * size for i in range(count)]
+        mb = size * count / 1e6
+        for name, run in (("per message", per_message), ("cached", cached), ("batch", batch)):
+            run(key, payloads[:BATCH])  # warm up
+            seal_s, open_s = run(key, payloads)
+            print(f"{size:>7} {name:<12} {mb / seal_s:>10.1f} {mb / open_s:>10.1f} "
+                  f"{(seal_s + open_s) / count * 1e6:>8.2f} {overhead / size:>+7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/lan_framing.py
+# Throughput of the LAN chat wire protocol over loopback TCP: the original
+# send() + recv(1024) + decode() per chunk, versus lan_protocol's length-
+# prefixed frames read with recv_into and written with batched sendmsg.
+# Run from the repo root with: python -m benchmarks.lan_framing
+#
+# "seen" is how many messages the receiver thinks it got. The original code
+# treats every recv() result as one message, so coalesced or split TCP reads
+# show up as a wrong count (and split UTF-8 characters as decode errors).
+
+import socket
+import threading
+import time
+
+from lan_protocol import MSG_TEXT, FrameBuffer, send_frames
+
+MESSAGES = 50000
+SIZES = (16, 200, 4000)
+BATCH = 64
+
+
+def tcp_pair():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+    return client, server
+
+
+def old_receiver(sock, result):
+    seen = errors = 0
+    while True:
+        data = sock.recv(1024)
+        if not data:
+            break
+        try:
+            data.decode()
+        except UnicodeDecodeError:
+            errors += 1
+        seen += 1
+    result.update(seen=seen, errors=errors)
+
+
+def old_sender(sock, msg):
+    for _ in range(MESSAGES):
+        sock.send(msg.encode())
+
+
+def new_receiver(sock, result):
+    seen = errors = 0
+    reader = FrameBuffer()
+    while reader.recv_from(sock):
+        frames, _ = reader.pop_frames()
+        for _, payload in frames:
+            try:
+                payload.decode()
+            except UnicodeDecodeError:
+                errors += 1
+            seen += 1
+    result.update(seen=seen, errors=errors)
+
+
+def new_sender(sock, msg):
+    payload = msg.encode()
+    for _ in range(MESSAGES // BATCH):
+        send_frames(sock, [(MSG_TEXT, payload)] * BATCH)
+    send_frames(sock, [(MSG_TEXT, payload)] * (MESSAGES % BATCH))
+
+
+def run(sender, receiver, msg):
+    tx, rx = tcp_pair()
+    result = {}
+    thread = threading.Thread(target=receiver, args=(rx, result))
+    thread.start()
+    start = time.perf_counter()
+    sender(tx, msg)
+    tx.shutdown(socket.SHUT_WR)
+    thread.join()
+    elapsed = time.perf_counter() - start
+    tx.close()
+    rx.close()
+    return elapsed, result
+
+
+def main():
+    print(f"{'impl':<10} {'size':>6} {'msgs/s':>10} {'MB/s':>8} {'seen':>8} {'decode errs':>11}")
+    for size in SIZES:
+        # Mix in a 2-byte character so split reads can cut it in half.
+        msg = ("é" + "x" * size)[:size]
+        nbytes = len(msg.encode()) * MESSAGES
+        for name, sender, receiver in (("original", old_sender, old_receiver), ("framed", new_sender, new_receiver)):
+            elapsed, result = run(sender, receiver, msg)
+            print(f"{name:<10} {size:>6} {MESSAGES / elapsed:>10.0f} {nbytes / elapsed / 1e6:>8.1f} "
+                  f"{result['seen']:>8} {result['errors']:>11}")
+
+
+if __name__ == "__main__":
+    main()
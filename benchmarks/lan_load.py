@@ -0,0 +1,93 @@
+# benchmarks/lan_load.py
+# Load test for lan_server.ChatServer: N clients connected at once, a few of
+# them sending, everyone else receiving the broadcast. Reports delivered
+# messages/s and p50/p99 send->receive latency as the client count grows.
+# Run from the repo root with: python -m benchmarks.lan_load
+#
+# The server runs in its own process so the client event loop does not share
+# its GIL.
+
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from lan_protocol import HEADER, HEADER_SIZE, MSG_TEXT, encode_frame
+from lan_server import ChatServer
+
+CLIENT_COUNTS = (10, 50, 100, 200, 400)
+SENDERS = 10
+MESSAGES_PER_SENDER = 100
+TIMEOUT = 60
+
+
+def run_server(port_queue):
+    server = ChatServer("127.0.0.1", 0)
+    port_queue.put(server.address[1])
+    server.serve_forever()
+
+
+async def reader(stream, latencies, expected):
+    while len(latencies) < expected:
+        try:
+            length, _ = HEADER.unpack(await stream.readexactly(HEADER_SIZE))
+            payload = await stream.readexactly(length)
+        except asyncio.IncompleteReadError:
+            break
+        latencies.append(time.perf_counter() - float(payload.split(b" ", 1)[1]))
+
+
+async def load(port, clients):
+    conns = [await asyncio.open_connection("127.0.0.1", port) for _ in range(clients)]
+    await asyncio.sleep(0.2)
+    senders = min(SENDERS, clients)
+    total = senders * MESSAGES_PER_SENDER
+    latencies = []
+    # Every message reaches every client except its sender.
+    expected = total * (clients - 1)
+    tasks = [asyncio.create_task(reader(r, latencies, expected)) for r, _ in conns]
+    start = time.perf_counter()
+    for i in range(MESSAGES_PER_SENDER):
+        for sender in range(senders):
+            conns[sender][1].write(encode_frame(MSG_TEXT, f"{sender} {time.perf_counter()!r}".encode()))
+        if i % 10 == 0:
+            await asyncio.sleep(0)
+    try:
+        await asyncio.wait_for(_wait_all(latencies, expected), TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    for t in tasks:
+        t.cancel()
+    for _, w in conns:
+        w.close()
+    return len(latencies), elapsed, latencies
+
+
+async def _wait_all(latencies, expected):
+    while len(latencies) < expected:
+        await asyncio.sleep(0.01)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    port_queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=run_server, args=(port_queue,), daemon=True)
+    proc.start()
+    port = port_queue.get()
+    print(f"{'clients':>7} {'delivered':>10} {'msgs/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for clients in CLIENT_COUNTS:
+            delivered, elapsed, lat = asyncio.run(load(port, clients))
+            print(f"{clients:>7} {delivered:>10} {delivered / elapsed:>10.0f} "
+                  f"{statistics.median(lat) * 1000:>8.2f} {percentile(lat, 0.99) * 1000:>8.2f}")
+    finally:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/lan_rerun_storm.py
+# Rerun count and CPU cost of getting 100 msgs/s from a socket thread onto the
+# page: one rerun per received packet (the old st.experimental_rerun() per
+# recv) versus draining lan_events.EventQueue on a 0.5 s fragment timer.
+# Run from the repo root with: python -m benchmarks.lan_rerun_storm
+#
+# A "rerun" here is what the chat script does on every run: build the
+# markdown for every message in the history. Streamlit's own per-rerun
+# overhead comes on top, so real savings are larger.
+
+import threading
+import time
+
+from lan_events import EventQueue
+
+RATE = 100
+DURATION = 10
+REFRESH_SECONDS = 0.5
+
+
+def render(messages):
+    out = []
+    for sender, msg in messages:
+        if sender == "me":
+            out.append(f"<div style='text-align:right;color:blue'><b>You:</b> {msg}</div>")
+        elif sender == "peer":
+            out.append(f"<div style='text-align:left;color:green'><b>Peer:</b> {msg}</div>")
+        else:
+            out.append(f"<div style='text-align:center;color:gray'><i>{msg}</i></div>")
+    return out
+
+
+def produce(deliver):
+    interval = 1 / RATE
+    next_at = time.perf_counter()
+    for i in range(RATE * DURATION):
+        deliver(("peer", f"message {i}"))
+        next_at += interval
+        time.sleep(max(0, next_at - time.perf_counter()))
+
+
+def per_packet_rerun():
+    messages = []
+    stats = {"reruns": 0, "cpu": 0.0}
+    lock = threading.Lock()
+
+    def deliver(event):
+        with lock:
+            start = time.thread_time()
+            messages.append(event)
+            render(messages)
+            stats["reruns"] += 1
+            stats["cpu"] += time.thread_time() - start
+
+    produce(deliver)
+    return stats, len(messages)
+
+
+def fragment_drain():
+    inbox = EventQueue()
+    messages = []
+    stats = {"reruns": 0, "cpu": 0.0}
+    done = threading.Event()
+
+    def fragment():
+        while not done.is_set() or len(inbox):
+            done.wait(REFRESH_SECONDS)
+            start = time.thread_time()
+            messages.extend(inbox.drain())
+            render(messages)
+            stats["reruns"] += 1
+            stats["cpu"] += time.thread_time() - start
+
+    thread = threading.Thread(target=fragment)
+    thread.start()
+    produce(inbox.put)
+    done.set()
+    thread.join()
+    return stats, len(messages)
+
+
+def main():
+    print(f"{RATE} msgs/s for {DURATION} s")
+    print(f"{'strategy':<20} {'messages':>9} {'reruns':>7} {'cpu s':>7} {'cpu %':>6}")
+    for name, run in (("rerun per packet", per_packet_rerun), ("fragment drain", fragment_drain)):
+        stats, count = run()
+        print(f"{name:<20} {count:>9} {stats['reruns']:>7} {stats['cpu']:>7.3f} {100 * stats['cpu'] / DURATION:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/qr_rerun_cost.py
+# Per-rerun cost and payload size of the password QR code: the old
+# qrcode.make() -> PNG path versus qr_share.qr_svg() with its LRU cache.
+# Run from the repo root with: python -m benchmarks.qr_rerun_cost
+
+import io
+import time
+
+import qrcode
+
+import qr_share
+
+PASSWORD = "correct horse battery staple"
+RERUNS = 200
+
+
+def png_rerun():
+    qr = qrcode.make(PASSWORD)
+    buf = io.BytesIO()
+    qr.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def bench(func):
+    start = time.perf_counter()
+    for _ in range(RERUNS):
+        out = func()
+    return (time.perf_counter() - start) / RERUNS * 1000, len(out)
+
+
+def main():
+    png_ms, png_bytes = bench(png_rerun)
+    qr_share.clear_cache()
+    start = time.perf_counter()
+    svg = qr_share.qr_svg(PASSWORD)
+    svg_cold_ms = (time.perf_counter() - start) * 1000
+    svg_ms, svg_bytes = bench(lambda: qr_share.qr_svg(PASSWORD))
+    print(f"{'path':<18} {'ms/rerun':>10} {'payload bytes':>14}")
+    print(f"{'PNG (uncached)':<18} {png_ms:>10.3f} {png_bytes:>14}")
+    print(f"{'SVG first render':<18} {svg_cold_ms:>10.3f} {len(svg):>14}")
+    print(f"{'SVG cached':<18} {svg_ms:>10.4f} {svg_bytes:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# benchmarks/relay_fanout.py
+# Sender upstream bytes and delivery latency: full mesh vs relay.RelayHub.
+# Run from the repo root with: python -m benchmarks.relay_fanout
+#
+# Loopback TCP streams stand in for the data channels so this runs without
+# aiortc or a browser; the relay side is the same RelayHub that relay.py
+# drives. In the mesh the sender writes every frame to each of the N-1 other
+# clients; through the relay it writes it once and the relay fans it out.
+# Latency is send -> receipt, per receiver and for the last receiver of each
+# frame, with one frame in flight at a time.
+
+import asyncio
+import os
+import struct
+import time
+
+from relay import RelayHub
+
+PREFIX = struct.Struct(">I")
+FRAME_SIZE = 256  # a short chat line after sealing
+MESSAGES = 200
+ROOM_SIZES = (2, 10, 50)
+
+
+class StreamChannel:
+    """The bits of RTCDataChannel that RelayHub uses, over an asyncio stream."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.sent = 0
+
+    @property
+    def bufferedAmount(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, data):
+        self.writer.write(PREFIX.pack(len(data)) + data)
+        self.sent += PREFIX.size + len(data)
+
+    def close(self):
+        self.writer.close()
+
+
+async def read_frame(reader):
+    (length,) = PREFIX.unpack(await reader.readexactly(PREFIX.size))
+    return await reader.readexactly(length)
+
+
+class Receivers:
+    def __init__(self, count):
+        self.count = count
+        self.latencies = []
+        self.last = []
+        self.pending = 0
+        self.done = asyncio.Event()
+
+    def expect(self):
+        self.pending = self.count
+        self.done.clear()
+
+    async def consume(self, reader):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                (sent_ns,) = struct.unpack_from(">Q", frame)
+                latency = (time.perf_counter_ns() - sent_ns) / 1000
+                self.latencies.append(latency)
+                self.pending -= 1
+                if not self.pending:
+                    self.last.append(latency)
+                    self.done.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+def frame():
+    body = bytearray(os.urandom(FRAME_SIZE))
+    struct.pack_into(">Q", body, 0, time.perf_counter_ns())
+    return bytes(body)
+
+
+async def send_all(channels, receivers):
+    for _ in range(MESSAGES):
+        receivers.expect()
+        data = frame()
+        for channel in channels:
+            channel.send(data)
+        await receivers.done.wait()
+
+
+async def run_mesh(clients):
+    receivers = Receivers(clients - 1)
+    servers, channels, tasks = [], [], []
+
+    async def on_connect(reader, writer):
+        tasks.append(asyncio.ensure_future(receivers.consume(reader)))
+
+    for _ in range(clients - 1):
+        server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+        servers.append(server)
+        _, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        channels.append(StreamChannel(writer))
+    while len(tasks) < clients - 1:
+        await asyncio.sleep(0)
+    await send_all(channels, receivers)
+    for channel in channels:
+        channel.close()
+    for server in servers:
+        server.close()
+    for task in tasks:
+        task.cancel()
+    return sum(c.sent for c in channels), receivers
+
+
+async def run_relay(clients):
+    hub = RelayHub()
+    receivers = Receivers(clients - 1)
+    tasks, handlers = [], []
+
+    async def on_connect(reader, writer):
+        handlers.append(asyncio.current_task())
+        peer = (await read_frame(reader)).decode()
+        hub.add(peer, StreamChannel(writer))
+        try:
+            while True:
+                hub.forward(peer, await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            hub.remove(peer)
+            writer.close()
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    address = server.sockets[0].getsockname()[:2]
+    channels = []
+    for i in range(clients):
+        reader, writer = await asyncio.open_connection(*address)
+        channel = StreamChannel(writer)
+        channel.send(f"peer-{i}".encode())
+        channels.append(channel)
+        if i:
+            tasks.append(asyncio.ensure_future(receivers.consume(reader)))
+    while len(hub.channels) < clients:
+        await asyncio.sleep(0)
+    sender = channels[0]
+    sender.sent = 0
+    await send_all([sender], receivers)
+    for channel in channels:
+        channel.close()
+    await asyncio.gather(*handlers)
+    server.close()
+    for task in tasks:
+        task.cancel()
+    return sender.sent, receivers
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main():
+    print(f"{MESSAGES} frames of {FRAME_SIZE} B from one sender, one in flight at a time")
+    print(f"{'clients':>7} {'mode':>6} {'upstream B/msg':>15} {'p50 us':>8} {'p99 us':>8} {'last p50 us':>12}")
+    for clients in ROOM_SIZES:
+        for mode, run in (("mesh", run_mesh), ("relay", run_relay)):
+            upstream, receivers = await run(clients)
+            print(
+                f"{clients:>7} {mode:>6} {upstream / MESSAGES:>15.0f} "
+                f"{percentile(receivers.latencies, 0.5):>8.0f} {percentile(receivers.latencies, 0.99):>8.0f} "
+                f"{percentile(receivers.last, 0.5):>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+# benchmarks/signaling_fanout.py
+# Fan-out cost of relaying one signaling message as the number of rooms grows.
+# Run from the repo root with: python -m benchmarks.signaling_fanout
+#
+# "broadcast" is what the public mirror does today: every socket gets every
+# message and the browser drops it with `if (data.room !== room) return`.
+# "room index" is signaling_server.RoomRouter, which only touches the peers
+# of the sender's room.
+
+import time
+
+from signaling_server import RoomRouter
+
+PEERS_PER_ROOM = 2
+MESSAGES = 200
+
+
+class FakePeer:
+    __slots__ = ("room", "received")
+
+    def __init__(self, room):
+        self.room = room
+        self.received = 0
+
+
+def bench_broadcast(peers, sender):
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        for p in peers:
+            if p is not sender:
+                p.received += 1
+    return (time.perf_counter() - start) / MESSAGES
+
+
+def bench_room_index(router, sender):
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        for p in router.peers(sender.room, exclude=sender):
+            p.received += 1
+    return (time.perf_counter() - start) / MESSAGES
+
+
+def main():
+    print(f"{'rooms':>7} {'sockets':>8} {'broadcast us/msg':>17} {'room index us/msg':>18}")
+    for rooms in (10, 100, 1000, 5000, 10000):
+        router = RoomRouter()
+        peers = []
+        for r in range(rooms):
+            for _ in range(PEERS_PER_ROOM):
+                peer = FakePeer(f"room-{r}")
+                router.join(peer, peer.room)
+                peers.append(peer)
+        sender = peers[len(peers) // 2]
+        broadcast = bench_broadcast(peers, sender) * 1e6
+        indexed = bench_room_index(router, sender) * 1e6
+        print(f"{rooms:>7} {len(peers):>8} {broadcast:>17.2f} {indexed:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/signaling_scaling.py
+# Signaling messages per second through signaling_shards.py as workers are added.
+# Run from the repo root with: python -m benchmarks.signaling_scaling [--workers 1 2 4 8]
+# Needs: pip install websockets, and twice as many cores as the largest worker count.
+#
+# For each worker count N the sharded tier is started on a free local port and
+# N load processes connect ROOMS rooms each, two WebSockets per room. Within a
+# room the two sockets bounce "candidate" messages back and forth, WINDOW at a
+# time, so the tier is never idle. A message counts when the other socket has
+# received it. The kernel spreads the sockets over the workers (SO_REUSEPORT),
+# so most rooms have their two sockets and their owner on different workers
+# and every message crosses the Unix-socket links at least once.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import time
+
+from signaling_shards import Supervisor
+
+ROOMS = 50
+WINDOW = 8
+WARMUP = 1.0
+DURATION = 5.0
+PAYLOAD = "a=candidate:1 1 udp 2122260223 192.168.1.23 54321 typ host generation 0 " * 2
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def room_pair(url, room, deadline, counts):
+    from websockets.asyncio.client import connect
+
+    async with connect(f"{url}/{room}") as a, connect(f"{url}/{room}") as b:
+        message = json.dumps({"room": room, "type": "candidate", "candidate": PAYLOAD})
+        await asyncio.sleep(0.2)  # both subscribed before the first message
+        for ws in (a, b):
+            for _ in range(WINDOW // 2):
+                await ws.send(message)
+
+        async def bounce(ws):
+            async for raw in ws:
+                if time.monotonic() >= deadline:
+                    return
+                if time.monotonic() >= deadline - DURATION:
+                    counts[0] += 1
+                await ws.send(raw)
+
+        await asyncio.wait([asyncio.create_task(bounce(a)), asyncio.create_task(bounce(b))],
+                           timeout=deadline - time.monotonic() + 1)
+
+
+def load(url, offset, results):
+    async def run():
+        counts = [0]
+        deadline = time.monotonic() + 0.5 + WARMUP + DURATION
+        await asyncio.gather(*(room_pair(url, f"bench-{offset}-{r}", deadline, counts) for r in range(ROOMS)))
+        return counts[0]
+
+    results.put(asyncio.run(run()))
+
+
+def measure(workers):
+    port = free_port()
+    supervisor = Supervisor(workers, host="127.0.0.1", port=port)
+    supervisor.start()
+    try:
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=load, args=(f"ws://127.0.0.1:{port}", i, results))
+                   for i in range(workers)]
+        for client in clients:
+            client.start()
+        total = sum(results.get() for _ in clients)
+        for client in clients:
+            client.join()
+    finally:
+        supervisor.stop()
+    return total / DURATION
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    cores = os.cpu_count() or 1
+    default = [n for n in (1, 2, 4, 8, 16) if 2 * n <= cores] or [1]
+    parser.add_argument("--workers", type=int, nargs="+", default=default)
+    opts = parser.parse_args()
+
+    print(f"{cores} cores; {ROOMS} rooms per load process, window {WINDOW}, {DURATION:.0f} s")
+    print(f"{'workers':>7} {'msgs/s':>10} {'speedup':>8} {'efficiency':>10}")
+    base = None
+    for workers in opts.workers:
+        rate = measure(workers)
+        base = base or rate / workers
+        speedup = rate / base
+        print(f"{workers:>7} {rate:>10.0f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# benchmarks/ttfm.py
+# Time to first message: Host/Join click -> first decrypted chat line, per phase.
+# Run from the repo root with: python -m benchmarks.ttfm [--runs 5] [--out FILE] [--baseline FILE]
+# Needs: pip install playwright && playwright install chromium
+#
+# Two headless Chromium pages load the component frontend from a local HTTP
+# server and get the props each app passes to p2p_chat (read from the app
+# source), with STUN disabled. The WebSocket to the signaling server is routed
+# by Playwright to an in-process stand-in that relays between the two pages.
+# The guest joins, the host hosts and sends "ping" as soon as its channel is
+# open; every phase mark in chat.js `metrics.phases` is put on one timeline
+# starting at the Host click. The host then runs the recovery path (ICE restart
+# plus outbox resume, chat.recover()) and the run records how long it took to
+# report "reconnected". Results are written as JSON (by default to the
+# git-ignored benchmarks/ttfm_results.json); with --baseline the medians are
+# compared and the exit status is 1 on a regression.
+
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("chatp2p_app.py", "p2p_app.py", "p2p chat1_app.py", "p2p chat2_app.py", "p2p chat03_app.py")
+PHASES = ("key", "signaling", "offerSent", "negotiated", "iceGathered", "connected", "channelOpen", "firstMessage")
+SIGNALING_URL = "ws://signaling.invalid"  # never dialed; Playwright routes it
+PASSWORD = "benchmark"
+TIMEOUT_MS = 30000
+
+# A phase regresses when its median grows by this factor and by at least NOISE_MS.
+REGRESSION = 1.25
+NOISE_MS = 5.0
+
+PAGE_METRICS = """() => ({
+    origin: performance.timeOrigin,
+    startedAt: window.p2pMetrics.startedAt,
+    phases: window.p2pMetrics.phases,
+    recoveryMs: window.p2pMetrics.recoveryMs,
+})"""
+
+SEND_WHEN_OPEN = """() => {
+    const timer = setInterval(() => {
+        if (window.p2pMetrics.phases.channelOpen == null) return;
+        clearInterval(timer);
+        document.getElementById("message").value = "ping";
+        document.getElementById("send-btn").click();
+    }, 1);
+}"""
+
+
+def literal_kwargs(node):
+    # Keyword arguments whose values are literals; variables like `room` are skipped.
+    props = {}
+    for kw in node.keywords:
+        try:
+            props[kw.arg] = ast.literal_eval(kw.value)
+        except ValueError:
+            pass
+    return props
+
+
+def component_defaults():
+    with open(os.path.join(REPO, "p2p_component", "__init__.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "p2p_chat":
+            args = node.args.args[-len(node.args.defaults):]
+            defaults = {}
+            for arg, value in zip(args, node.args.defaults):
+                try:
+                    defaults[arg.arg] = ast.literal_eval(value)
+                except ValueError:
+                    pass
+            return defaults
+    raise RuntimeError("p2p_chat not found in p2p_component/__init__.py")
+
+
+def app_props(app):
+    with open(os.path.join(REPO, app), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "p2p_chat":
+            return literal_kwargs(node)
+    raise RuntimeError(f"{app} does not call p2p_chat")
+
+
+def serve_repo():
+    handler = partial(SimpleHTTPRequestHandler, directory=REPO)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def route_signaling(context):
+    sockets = []
+
+    def on_socket(ws):
+        sockets.append(ws)
+        ws.on_message(lambda message: [other.send(message) for other in sockets if other is not ws])
+
+    context.route_web_socket(re.compile(r"^ws://signaling\.invalid/"), on_socket)
+
+
+def run_once(browser, base_url, args):
+    context = browser.new_context()
+    try:
+        route_signaling(context)
+        host, guest = context.new_page(), context.new_page()
+        for page in (host, guest):
+            page.goto(f"{base_url}/p2p_component/frontend/index.html")
+            page.evaluate("args => window.postMessage({ type: 'streamlit:render', args }, '*')", args)
+        # No offer caching in the signaling path: the guest must be listening first.
+        guest.click("#join-btn")
+        guest.wait_for_function("() => window.p2pMetrics.phases.signaling != null", timeout=TIMEOUT_MS)
+        host.evaluate(SEND_WHEN_OPEN)
+        host.click("#host-btn")
+        guest.wait_for_function("() => window.p2pMetrics.phases.firstMessage != null", timeout=TIMEOUT_MS)
+        host.evaluate("() => window.p2pRecover()")
+        host.wait_for_function("() => window.p2pMetrics.recoveries > 0", timeout=TIMEOUT_MS)
+        h, g = host.evaluate(PAGE_METRICS), guest.evaluate(PAGE_METRICS)
+    finally:
+        context.close()
+    t0 = h["origin"] + h["startedAt"]
+    g0 = g["origin"] + g["startedAt"] - t0
+    return {
+        "host": {p: h["phases"][p] for p in PHASES if p in h["phases"]},
+        "guest": {p: g0 + g["phases"][p] for p in PHASES if p in g["phases"]},
+        "total": g0 + g["phases"]["firstMessage"],
+        "recovery": h["recoveryMs"],
+    }
+
+
+def summarize(runs):
+    median = {"total": statistics.median(r["total"] for r in runs),
+              "recovery": statistics.median(r["recovery"] for r in runs)}
+    for role in ("host", "guest"):
+        for phase in PHASES:
+            values = [r[role][phase] for r in runs if phase in r[role]]
+            if values:
+                median[f"{role}.{phase}"] = statistics.median(values)
+    return median
+
+
+def compare(results, baseline):
+    regressions = []
+    for app, variant in results["variants"].items():
+        old = baseline.get("variants", {}).get(app, {}).get("median", {})
+        for name, value in variant["median"].items():
+            before = old.get(name)
+            if before is not None and value > before * REGRESSION and value - before > NOISE_MS:
+                regressions.append(f"{app} {name}: {before:.1f} -> {value:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default=os.path.join(REPO, "benchmarks", "ttfm_results.json"))
+    parser.add_argument("--baseline")
+    opts = parser.parse_args(argv)
+
+    from playwright.sync_api import sync_playwright
+
+    defaults = component_defaults()
+    server = serve_repo()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": opts.runs, "variants": {}}
+    try:
+        with sync_playwright() as p:
+            # Plain host candidates: no mDNS lookups between the two local pages.
+            browser = p.chromium.launch(args=["--disable-features=WebRtcHideLocalIpsWithMdns"])
+            results["browser"] = browser.version
+            for app in APPS:
+                props = {**defaults, **app_props(app)}
+                runs = []
+                for i in range(opts.runs):
+                    args = {**props, "room": f"ttfm-{i}", "password": PASSWORD,
+                            "signaling_url": SIGNALING_URL, "ice_servers": []}
+                    runs.append(run_once(browser, base_url, args))
+                median = summarize(runs)
+                results["variants"][app] = {"props": props, "runs": runs, "median": median}
+                print(f"{app:<20} first message {median['total']:7.1f} ms  (key {median['host.key']:.1f}, "
+                      f"negotiated {median['host.negotiated']:.1f}, channel {median['host.channelOpen']:.1f}), "
+                      f"recovery {median['recovery']:.1f} ms")
+            browser.close()
+    finally:
+        server.shutdown()
+
+    with open(opts.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {opts.out}")
+
+    if opts.baseline:
+        with open(opts.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/unordered_latency.py
+# Chat delivery latency (send click -> peer's onMessage) over the default
+# ordered channel versus the unordered lane (unordered=True, unordered.js),
+# with packet loss and delay on loopback via netem.
+# Run from the repo root with: sudo python -m benchmarks.unordered_latency [--netem "delay 10ms loss 2%"]
+# Needs: pip install playwright && playwright install chromium, and root for tc.
+#
+# Uses the same two-page setup as benchmarks/ttfm.py (local HTTP server,
+# in-process signaling, host candidates only). netem is applied to `lo` for the
+# whole run, so both directions see the delay and loss. With --no-netem the
+# link is left alone (for checking the harness without root). The host sends
+# MESSAGES lines every INTERVAL_MS; latencies use both pages' clocks, which
+# are the same machine's.
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+from benchmarks.ttfm import PASSWORD, SIGNALING_URL, TIMEOUT_MS, component_defaults, route_signaling, serve_repo
+
+MESSAGES = 500
+INTERVAL_MS = 20
+MODES = (("ordered", False), ("unordered", True))
+
+RECORD_ARRIVALS = """() => {
+    window.arrivals = {};
+    const original = window.p2pEvents.onMessage;
+    window.p2pEvents.onMessage = (who, text) => {
+        if (who !== "you") window.arrivals[text] = performance.timeOrigin + performance.now();
+        original(who, text);
+    };
+}"""
+
+SEND_ALL = """async ([count, interval]) => {
+    const sent = {};
+    const input = document.getElementById("message");
+    for (let i = 0; i < count; i++) {
+        input.value = `m${i}`;
+        sent[input.value] = performance.timeOrigin + performance.now();
+        document.getElementById("send-btn").click();
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+    return sent;
+}"""
+
+
+def netem(spec):
+    if spec:
+        subprocess.run(["tc", "qdisc", "replace", "dev", "lo", "root", "netem", *spec.split()], check=True)
+    else:
+        subprocess.run(["tc", "qdisc", "del", "dev", "lo", "root"], check=False, stderr=subprocess.DEVNULL)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_mode(browser, base_url, props, count):
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    context = browser.new_context()
+    try:
+        route_signaling(context)
+        host, guest = context.new_page(), context.new_page()
+        for page in (host, guest):
+            page.goto(f"{base_url}/p2p_component/frontend/index.html")
+            page.evaluate("args => window.postMessage({ type: 'streamlit:render', args }, '*')", props)
+        guest.evaluate(RECORD_ARRIVALS)
+        guest.click("#join-btn")
+        guest.wait_for_function("() => window.p2pMetrics.phases.signaling != null", timeout=TIMEOUT_MS)
+        host.click("#host-btn")
+        # Warm up until a line gets through, so the handshake is not in the numbers.
+        host.wait_for_function("() => window.p2pMetrics.phases.channelOpen != null", timeout=TIMEOUT_MS)
+        host.evaluate(SEND_ALL, [1, 0])
+        guest.wait_for_function("() => 'm0' in window.arrivals", timeout=TIMEOUT_MS)
+        guest.evaluate("() => (window.arrivals = {})")
+        sent = host.evaluate(SEND_ALL, [count, INTERVAL_MS])
+        try:
+            guest.wait_for_function(f"() => Object.keys(window.arrivals).length >= {count}", timeout=TIMEOUT_MS)
+        except PlaywrightTimeout:
+            pass  # report what arrived
+        arrivals = guest.evaluate("() => window.arrivals")
+    finally:
+        context.close()
+    return [arrivals[text] - at for text, at in sent.items() if text in arrivals]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--netem", default="delay 10ms loss 2%", help="netem parameters for lo")
+    parser.add_argument("--no-netem", action="store_true")
+    parser.add_argument("--messages", type=int, default=MESSAGES)
+    opts = parser.parse_args(argv)
+
+    from playwright.sync_api import sync_playwright
+
+    server = serve_repo()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    if not opts.no_netem:
+        netem(opts.netem)
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(args=["--disable-features=WebRtcHideLocalIpsWithMdns"])
+            print(f"{opts.messages} messages every {INTERVAL_MS} ms, lo: {'none' if opts.no_netem else opts.netem}")
+            print(f"{'mode':<10} {'delivered':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mean ms':>8}")
+            for i, (mode, unordered) in enumerate(MODES):
+                props = {**component_defaults(), "room": f"latency-{i}", "password": PASSWORD,
+                         "signaling_url": SIGNALING_URL, "ice_servers": [], "unordered": unordered}
+                latencies = run_mode(browser, base_url, props, opts.messages)
+                if not latencies:
+                    print(f"{mode:<10} {0:>9}")
+                    continue
+                print(f"{mode:<10} {len(latencies):>9} {percentile(latencies, 0.5):>8.1f} "
+                      f"{percentile(latencies, 0.99):>8.1f} {max(latencies):>8.1f} {statistics.mean(latencies):>8.1f}")
+            browser.close()
+    finally:
+        if not opts.no_netem:
+            netem(None)
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
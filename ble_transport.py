@@ -0,0 +1,113 @@
+# ble_transport.py
+# Fragmentation for the Web Bluetooth chat ("P2P via Web Bluetooth testing")
+# and a loopback emulator of a GATT characteristic, so the transport can be
+# measured without Bluetooth hardware (benchmarks/ble_throughput.py).
+#
+# A characteristic write carries at most ATT_MTU - 3 bytes. Every encrypted
+# message (IV + ciphertext) is cut into fragments with a 4-byte header:
+# [uint16 message id][uint8 fragment index][uint8 index of the last fragment].
+# The page sends them with writeValueWithoutResponse, at most a small window
+# of writes unfinished at a time, and reassembles on characteristicvaluechanged.
+
+import asyncio
+import struct
+
+FRAG_HEADER = struct.Struct(">HBB")
+MAX_FRAGMENTS = 256
+ATT_OVERHEAD = 3
+DEFAULT_MTU = 23
+WRITE_WINDOW = 4
+
+
+def fragment(data, msg_id, mtu=DEFAULT_MTU):
+    size = mtu - ATT_OVERHEAD - FRAG_HEADER.size
+    count = max(1, -(-len(data) // size))
+    if count > MAX_FRAGMENTS:
+        raise ValueError(f"message too long for ATT MTU {mtu}")
+    return [FRAG_HEADER.pack(msg_id & 0xFFFF, i, count - 1) + data[i * size:(i + 1) * size] for i in range(count)]
+
+
+class Reassembler:
+    """Collects fragments per message id; keeps at most `max_partial` incomplete messages."""
+
+    def __init__(self, max_partial=4):
+        self.partial = {}
+        self.max_partial = max_partial
+
+    def feed(self, packet):
+        # Returns the whole message when `packet` completes one, else None.
+        if len(packet) < FRAG_HEADER.size:
+            return None
+        msg_id, index, last = FRAG_HEADER.unpack_from(packet)
+        parts = self.partial.get(msg_id)
+        if parts is None:
+            parts = self.partial[msg_id] = [None] * (last + 1)
+            if len(self.partial) > self.max_partial:
+                del self.partial[next(iter(self.partial))]
+        if index > last or len(parts) != last + 1 or parts[index] is not None:
+            return None
+        parts[index] = packet[FRAG_HEADER.size:]
+        if any(part is None for part in parts):
+            return None
+        del self.partial[msg_id]
+        return b"".join(parts)
+
+
+class LoopbackLink:
+    """One direction of an emulated BLE link, client write -> server characteristic.
+
+    Packets leave one at a time at `rate` bytes per second and arrive `latency`
+    seconds later. A write with response resolves when the response is back
+    (one round trip per packet); a write without response resolves once the
+    controller has taken the packet, which waits while `buffer` packets are
+    queued. Values larger than mtu - 3 are rejected like a real stack does.
+    """
+
+    def __init__(self, on_value, mtu=DEFAULT_MTU, latency=0.00375, rate=125_000, buffer=8):
+        self.on_value = on_value
+        self.mtu = mtu
+        self.latency = latency
+        self.rate = rate
+        self.buffer = buffer
+        self.busy_until = 0.0
+        self.queued = 0
+        self.drained = asyncio.Event()
+
+    def _transmit(self, value):
+        if len(value) > self.mtu - ATT_OVERHEAD:
+            raise ValueError(f"value of {len(value)} bytes exceeds ATT MTU {self.mtu}")
+        loop = asyncio.get_running_loop()
+        # 10 bytes of link-layer and L2CAP headers per packet.
+        departure = max(loop.time(), self.busy_until) + (len(value) + ATT_OVERHEAD + 10) / self.rate
+        self.busy_until = departure
+        self.queued += 1
+        loop.call_at(departure, self._departed)
+        loop.call_at(departure + self.latency, self.on_value, bytes(value))
+        return departure
+
+    def _departed(self):
+        self.queued -= 1
+        self.drained.set()
+
+    async def write_with_response(self, value):
+        departure = self._transmit(value)
+        await asyncio.sleep(departure + 2 * self.latency - asyncio.get_running_loop().time())
+
+    async def write_without_response(self, value):
+        while self.queued >= self.buffer:
+            self.drained.clear()
+            await self.drained.wait()
+        self._transmit(value)
+
+
+async def send_message(link, data, msg_id, window=WRITE_WINDOW):
+    # Same pipelining as the page: at most `window` unfinished writes without response.
+    in_flight = []
+    for packet in fragment(data, msg_id, link.mtu):
+        if window <= 0:
+            await link.write_with_response(packet)
+            continue
+        if len(in_flight) >= window:
+            await in_flight.pop(0)
+        in_flight.append(asyncio.ensure_future(link.write_without_response(packet)))
+    await asyncio.gather(*in_flight)
@@ -0,0 +1,143 @@
+# chat_history.py
+# Bounded chat history for the LAN chat (testing1).
+#
+# The newest `capacity` messages live in a fixed-size ring of __slots__
+# records. Older ones spill, in batches, to an append-only SQLite table and are
+# read back a page at a time, so memory stays flat however long the session
+# runs and the script only ever renders one page. A temporary database (and
+# its -wal/-shm files) is deleted on close(), when the history is garbage
+# collected with its Streamlit session, or at interpreter exit. A history kept
+# in a named file also writes out the ring on close(), and reopening the file
+# carries on after its last message with the newest ones back in the ring.
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+
+SENDERS = ("me", "peer", "system")
+_SENDER_CODES = {name: code for code, name in enumerate(SENDERS)}
+
+SPILL_BATCH = 256
+
+
+class Record:
+    __slots__ = ("seq", "ts", "sender", "text")
+
+    def __init__(self, seq, ts, sender, text):
+        self.seq = seq
+        self.ts = ts
+        self.sender = sender
+        self.text = text
+
+    def as_tuple(self):
+        return self.seq, self.ts, SENDERS[self.sender], self.text
+
+
+def _discard(db, path):
+    # Finalizer: must not reference the ChatHistory itself.
+    db.close()
+    if path is None:
+        return
+    for name in (path, path + "-wal", path + "-shm"):
+        try:
+            os.unlink(name)
+        except FileNotFoundError:
+            pass
+
+
+class ChatHistory:
+    def __init__(self, path=None, capacity=500):
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(prefix="lan_chat_", suffix=".sqlite3")
+            os.close(fd)
+        self.path = path
+        self.capacity = capacity
+        self.ring = [None] * capacity
+        self.next_seq = 0
+        self.spilled = []
+        self._lock = threading.Lock()
+        # Streamlit may run successive reruns on different threads.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # The log is a spill area, not a ledger: skip the fsync on every batch.
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "seq INTEGER PRIMARY KEY, ts REAL NOT NULL, sender INTEGER NOT NULL, text TEXT NOT NULL)"
+        )
+        self.db.commit()
+        self._load()
+        self._finalizer = weakref.finalize(self, _discard, self.db, path if temporary else None)
+
+    def _load(self):
+        rows = self.db.execute(
+            "SELECT seq, ts, sender, text FROM messages ORDER BY seq DESC LIMIT ?", (self.capacity,)
+        ).fetchall()
+        for seq, ts, sender, text in rows:
+            self.ring[seq % self.capacity] = Record(seq, ts, sender, text)
+        if rows:
+            self.next_seq = rows[0][0] + 1
+
+    def __len__(self):
+        return self.next_seq
+
+    def append(self, sender, text):
+        with self._lock:
+            seq = self.next_seq
+            slot = seq % self.capacity
+            evicted = self.ring[slot]
+            if evicted is not None:
+                self.spilled.append((evicted.seq, evicted.ts, evicted.sender, evicted.text))
+                if len(self.spilled) >= SPILL_BATCH:
+                    self._flush()
+            self.ring[slot] = Record(seq, time.time(), _SENDER_CODES[sender], text)
+            self.next_seq = seq + 1
+            return seq
+
+    def _flush(self):
+        if self.spilled:
+            # Records reloaded from the file are already there; they never change.
+            self.db.executemany("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?)", self.spilled)
+            self.db.commit()
+            self.spilled.clear()
+
+    def range(self, start, stop):
+        """Messages with start <= seq < stop as (seq, ts, sender, text), oldest first."""
+        with self._lock:
+            start = max(0, start)
+            stop = min(stop, self.next_seq)
+            if start >= stop:
+                return []
+            in_ring = max(start, self.next_seq - self.capacity)
+            rows = []
+            if start < in_ring:
+                self._flush()
+                rows = [
+                    (seq, ts, SENDERS[sender], text)
+                    for seq, ts, sender, text in self.db.execute(
+                        "SELECT seq, ts, sender, text FROM messages WHERE seq >= ? AND seq < ? ORDER BY seq",
+                        (start, min(stop, in_ring)),
+                    )
+                ]
+            rows.extend(self.ring[seq % self.capacity].as_tuple() for seq in range(in_ring, stop))
+            return rows
+
+    def page_count(self, page_size):
+        return max(1, -(-self.next_seq // page_size))
+
+    def page(self, page, page_size=50):
+        """Page 0 is the newest `page_size` messages, page 1 the ones before, and so on."""
+        stop = self.next_seq - page * page_size
+        return self.range(stop - page_size, stop)
+
+    def close(self):
+        with self._lock:
+            self.spilled.extend(
+                (record.seq, record.ts, record.sender, record.text) for record in self.ring if record is not None
+            )
+            self._flush()
+            self._finalizer()
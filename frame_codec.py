@@ -0,0 +1,226 @@
+# frame_codec.py
+# Python side of the encrypted chat frame (p2p_component/frontend/frame.js).
+#
+#   offset  size  field
+#   0       1     version
+#   1       1     flags
+#   2       12    AES-GCM IV
+#   14      4     sequence number (uint32, big-endian)
+#   18      n+16  ciphertext + GCM tag
+#
+# The header is authenticated as GCM additional data. Frames are packed into a
+# single bytearray and parsed into memoryview slices, so nothing is copied.
+# FrameCipher, seal() and open_frame() need the optional `cryptography` package.
+
+import hashlib
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+VERSION = 1
+IV_SIZE = 12
+TAG_SIZE = 16
+HEADER = struct.Struct(">BB12sI")
+HEADER_SIZE = HEADER.size
+
+# flags
+FLAG_BATCH = 0x01    # payload is several length-prefixed messages
+FLAG_CONTROL = 0x02  # payload is a JSON control message
+FLAG_CHUNK = 0x04    # payload is a file chunk: [uint32 id][uint32 index][data]
+FLAG_HISTORY = 0x08  # payload is a batch of stored log frames
+FLAG_HANDSHAKE = 0x10  # ECDH hello, sealed with the room key
+FLAG_SESSION = 0x20  # sealed with a per-connection session key
+FLAG_DEFLATE = 0x40  # payload is raw-deflate compressed before sealing
+
+# Smaller payloads are sent as-is: deflate would cost latency and save little.
+COMPRESS_MIN = 1024
+# Refuse payloads that inflate beyond this (decompression bombs).
+MAX_INFLATED = 16 * 1024 * 1024
+
+CHUNK_HEADER = struct.Struct(">II")
+MAX_FRAME_SIZE = 16 * 1024
+CHUNK_SIZE = MAX_FRAME_SIZE - HEADER_SIZE - TAG_SIZE - CHUNK_HEADER.size
+
+SALT = b"p2p-chat"
+ITERATIONS = 50000
+
+Frame = namedtuple("Frame", "version flags seq header iv ciphertext")
+
+
+def pack_frame(iv, seq, ciphertext, flags=0):
+    buf = bytearray(HEADER_SIZE + len(ciphertext))
+    HEADER.pack_into(buf, 0, VERSION, flags, iv, seq)
+    buf[HEADER_SIZE:] = ciphertext
+    return buf
+
+
+def parse_frame(data):
+    mv = memoryview(data)
+    if len(mv) < HEADER_SIZE + TAG_SIZE:
+        raise ValueError("frame too short")
+    if mv[0] != VERSION:
+        raise ValueError(f"unsupported frame version {mv[0]}")
+    return Frame(
+        version=mv[0],
+        flags=mv[1],
+        seq=int.from_bytes(mv[14:HEADER_SIZE], "big"),
+        header=mv[:HEADER_SIZE],
+        iv=mv[2:14],
+        ciphertext=mv[HEADER_SIZE:],
+    )
+
+
+def pack_batch(messages):
+    # Batch payload: repeated [uint32 length][message bytes].
+    buf = bytearray(sum(4 + len(m) for m in messages))
+    offset = 0
+    for m in messages:
+        struct.pack_into(">I", buf, offset, len(m))
+        buf[offset + 4:offset + 4 + len(m)] = m
+        offset += 4 + len(m)
+    return buf
+
+
+def unpack_batch(payload):
+    mv = memoryview(payload)
+    messages = []
+    offset = 0
+    while offset < len(mv):
+        (length,) = struct.unpack_from(">I", mv, offset)
+        offset += 4
+        if offset + length > len(mv):
+            raise ValueError("truncated batch")
+        messages.append(mv[offset:offset + length])
+        offset += length
+    return messages
+
+
+def pack_chunk(transfer_id, index, data):
+    buf = bytearray(CHUNK_HEADER.size + len(data))
+    CHUNK_HEADER.pack_into(buf, 0, transfer_id, index)
+    buf[CHUNK_HEADER.size:] = data
+    return buf
+
+
+def parse_chunk(payload):
+    mv = memoryview(payload)
+    transfer_id, index = CHUNK_HEADER.unpack_from(mv)
+    return transfer_id, index, mv[CHUNK_HEADER.size:]
+
+
+def deflate(payload):
+    # Raw deflate, the browser's CompressionStream("deflate-raw").
+    packer = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return packer.compress(payload) + packer.flush()
+
+
+def inflate(payload, max_size=MAX_INFLATED):
+    unpacker = zlib.decompressobj(-15)
+    # One byte over the limit: output that stops short of it is all there is.
+    out = unpacker.decompress(payload, max_size + 1)
+    if len(out) > max_size or unpacker.unconsumed_tail:
+        raise ValueError("inflated payload too large")
+    if not unpacker.eof:
+        raise ValueError("truncated deflate stream")
+    if unpacker.unused_data:
+        raise ValueError("data after the end of the deflate stream")
+    return out
+
+
+def compress_payload(payload, flags=0):
+    """(payload, flags) with FLAG_DEFLATE set when compressing pays off."""
+    if len(payload) < COMPRESS_MIN or flags & FLAG_CHUNK:
+        return payload, flags
+    packed = deflate(payload)
+    if len(packed) >= len(payload):
+        return payload, flags
+    return packed, flags | FLAG_DEFLATE
+
+
+def derive_key(password, salt=SALT, iterations=ITERATIONS):
+    # Same PBKDF2-SHA256 parameters as the browser, so keys match.
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=32)
+
+
+class FrameCipher:
+    """AES-GCM frames under one key.
+
+    The AESGCM object (and its key schedule) is built once and reused for every
+    frame, and the cipher numbers its own frames. seal_many()/open_many() handle
+    a burst in one call, with one os.urandom for all IVs and the per-frame work
+    kept to a struct call and the AEAD call.
+    """
+
+    def __init__(self, key, seq=0):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self.aead = AESGCM(bytes(key))
+        self.seq = seq
+
+    def next_seq(self, count=1):
+        seq = self.seq
+        self.seq = (seq + count) & 0xFFFFFFFF
+        return seq
+
+    def seal(self, payload, flags=0, compress=False, seq=None):
+        if compress:
+            payload, flags = compress_payload(payload, flags)
+        if seq is None:
+            seq = self.next_seq()
+        iv = os.urandom(IV_SIZE)
+        header = HEADER.pack(VERSION, flags, iv, seq)
+        return header + self.aead.encrypt(iv, payload, header)
+
+    def seal_many(self, payloads, flags=0, compress=False):
+        """One frame per payload, numbered consecutively."""
+        if compress:
+            packed = [compress_payload(payload, flags) for payload in payloads]
+        else:
+            packed = [(payload, flags) for payload in payloads]
+        ivs = os.urandom(IV_SIZE * len(packed))
+        seq = self.next_seq(len(packed))
+        encrypt, pack = self.aead.encrypt, HEADER.pack
+        frames = []
+        for i, (payload, frame_flags) in enumerate(packed):
+            iv = ivs[i * IV_SIZE:(i + 1) * IV_SIZE]
+            header = pack(VERSION, frame_flags, iv, (seq + i) & 0xFFFFFFFF)
+            frames.append(header + encrypt(iv, payload, header))
+        return frames
+
+    def open(self, data):
+        frame = parse_frame(data)
+        payload = self.aead.decrypt(frame.iv, frame.ciphertext, frame.header)
+        if frame.flags & FLAG_DEFLATE:
+            payload = inflate(payload)
+        return frame.flags, frame.seq, payload
+
+    def open_many(self, frames):
+        """[(flags, seq, payload)] in order; None for a frame that fails to parse or authenticate."""
+        from cryptography.exceptions import InvalidTag
+
+        decrypt, unpack = self.aead.decrypt, HEADER.unpack_from
+        opened = []
+        for data in frames:
+            if len(data) < HEADER_SIZE + TAG_SIZE or data[0] != VERSION:
+                opened.append(None)
+                continue
+            _, flags, iv, seq = unpack(data)
+            try:
+                payload = decrypt(iv, memoryview(data)[HEADER_SIZE:], data[:HEADER_SIZE])
+                if flags & FLAG_DEFLATE:
+                    payload = inflate(payload)
+            except (InvalidTag, ValueError, zlib.error):
+                opened.append(None)
+            else:
+                opened.append((flags, seq, payload))
+        return opened
+
+
+# One-off helpers; anything sending more than a frame should keep a FrameCipher.
+def seal(key, payload, seq, flags=0, compress=False):
+    return FrameCipher(key).seal(payload, flags, compress, seq=seq)
+
+
+def open_frame(key, data):
+    return FrameCipher(key).open(data)
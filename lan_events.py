@@ -0,0 +1,39 @@
+# lan_events.py
+# Bounded, thread-safe inbox between the socket threads and the Streamlit
+# script of the LAN chat (testing1).
+#
+# Socket threads only ever call put(); the script drains everything that
+# arrived since its last run in one batch from a timed fragment, so N incoming
+# messages cost one refresh instead of N reruns, and st.session_state is only
+# touched from the script thread.
+
+import threading
+from collections import deque
+
+
+class EventQueue:
+    def __init__(self, maxsize=10000):
+        self._items = deque()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def put(self, event):
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                # Keep the newest events; a stalled script should not grow memory.
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(event)
+
+    def drain(self, max_items=None):
+        with self._lock:
+            if max_items is None or max_items >= len(self._items):
+                items = list(self._items)
+                self._items.clear()
+            else:
+                items = [self._items.popleft() for _ in range(max_items)]
+        return items
+
+    def __len__(self):
+        return len(self._items)
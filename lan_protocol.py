@@ -0,0 +1,112 @@
+# lan_protocol.py
+# Wire format for the LAN socket chat (testing1 / lan_server.py).
+#
+# Every message is a frame: [uint32 payload length][uint8 type][payload].
+# TCP is a byte stream, so a recv() can return half a message or several at
+# once; FrameBuffer reassembles frames from a reusable bytearray filled with
+# recv_into, and send_frames writes many frames with a single sendmsg call.
+# testing1 only sends MSG_SEALED: the payload is an AES-GCM frame in the
+# browser chats' format (frame_codec.py), so the relay never sees plaintext.
+
+import struct
+
+HEADER = struct.Struct(">IB")
+HEADER_SIZE = HEADER.size
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+# message types
+MSG_TEXT = 1
+MSG_SYSTEM = 2
+MSG_SEALED = 3  # payload is a frame_codec frame
+
+IOV_MAX = 1024
+
+
+def encode_frame(msg_type, payload):
+    buf = bytearray(HEADER_SIZE + len(payload))
+    HEADER.pack_into(buf, 0, len(payload), msg_type)
+    buf[HEADER_SIZE:] = payload
+    return buf
+
+
+class FrameBuffer:
+    """Receive buffer reused across recv_into calls."""
+
+    def __init__(self, size=65536):
+        self.buf = bytearray(size)
+        self.start = 0
+        self.end = 0
+
+    def writable(self):
+        # Free space after the buffered bytes; compacts or grows when needed.
+        if self.start == self.end:
+            self.start = self.end = 0
+        if self.end == len(self.buf):
+            pending = self.end - self.start
+            needed = self._frame_size()
+            if self.start:
+                self.buf[:pending] = self.buf[self.start:self.end]
+                self.start, self.end = 0, pending
+            if needed > len(self.buf) or self.end == len(self.buf):
+                self.buf.extend(bytes(max(needed, 2 * len(self.buf)) - len(self.buf)))
+        return memoryview(self.buf)[self.end:]
+
+    def commit(self, n):
+        self.end += n
+
+    def recv_from(self, sock):
+        # Returns the number of bytes read; 0 means the peer closed.
+        with self.writable() as view:
+            n = sock.recv_into(view)
+        self.commit(n)
+        return n
+
+    def _frame_size(self):
+        if self.end - self.start < HEADER_SIZE:
+            return HEADER_SIZE
+        length, _ = HEADER.unpack_from(self.buf, self.start)
+        if length > MAX_PAYLOAD:
+            raise ValueError(f"frame of {length} bytes exceeds MAX_PAYLOAD")
+        return HEADER_SIZE + length
+
+    def pop_frames(self):
+        """Return ([(type, payload bytes)], raw bytes of those frames)."""
+        frames = []
+        first = pos = self.start
+        while self.end - pos >= HEADER_SIZE:
+            length, msg_type = HEADER.unpack_from(self.buf, pos)
+            if length > MAX_PAYLOAD:
+                raise ValueError(f"frame of {length} bytes exceeds MAX_PAYLOAD")
+            if self.end - pos - HEADER_SIZE < length:
+                break
+            body = pos + HEADER_SIZE
+            frames.append((msg_type, bytes(self.buf[body:body + length])))
+            pos = body + length
+        self.start = pos
+        return frames, bytes(self.buf[first:pos])
+
+
+def send_frames(sock, frames):
+    """Write [(type, payload), ...] to a blocking socket with as few syscalls as possible."""
+    buffers = []
+    for msg_type, payload in frames:
+        buffers.append(HEADER.pack(len(payload), msg_type))
+        buffers.append(payload)
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(buffers))
+        return
+    views = [memoryview(b) for b in buffers if len(b)]
+    i = 0
+    while i < len(views):
+        sent = sock.sendmsg(views[i:i + IOV_MAX])
+        while sent:
+            if sent >= len(views[i]):
+                sent -= len(views[i])
+                i += 1
+            else:
+                views[i] = views[i][sent:]
+                sent = 0
+
+
+def send_frame(sock, msg_type, payload):
+    send_frames(sock, [(msg_type, payload)])
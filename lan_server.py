@@ -0,0 +1,190 @@
+# lan_server.py
+# Multi-client server for the LAN socket chat (testing1).
+#
+# One thread multiplexes every connection with `selectors`. Messages use the
+# length-prefixed frames from lan_protocol.py; each complete frame from a
+# client is handed to `on_message` (or all frames of one read together to
+# `on_frames`) and relayed to every other client. Every connection has its own
+# outbound buffer that is flushed when the socket is writable, so one slow
+# client never blocks the others (and is dropped once its buffer overflows).
+
+import selectors
+import socket
+import threading
+from collections import deque
+
+from lan_protocol import MSG_TEXT, FrameBuffer, encode_frame
+
+MAX_OUTBUF = 1024 * 1024
+
+
+class Connection:
+    __slots__ = ("sock", "addr", "reader", "outbuf", "writing")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.reader = FrameBuffer()
+        self.outbuf = bytearray()
+        self.writing = False
+
+
+class ChatServer:
+    def __init__(self, host, port, on_message=None, on_event=None, backlog=512, on_frames=None):
+        self.on_message = on_message or (lambda addr, msg_type, payload: None)
+        self.on_frames = on_frames
+        self.on_event = on_event or (lambda text: None)
+        self.sel = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(backlog)
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+        self.sel.register(self.listener, selectors.EVENT_READ, None)
+        # Wakes the loop when another thread queues a broadcast.
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.sel.register(self.wake_r, selectors.EVENT_READ, None)
+        self.outgoing = deque()
+        self.connections = {}
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.running = False
+        self._wake()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+    @property
+    def client_count(self):
+        return len(self.connections)
+
+    # Thread-safe: may be called from the Streamlit script thread.
+    def broadcast(self, payload, msg_type=MSG_TEXT):
+        self.outgoing.append(encode_frame(msg_type, payload))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self.wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def serve_forever(self):
+        self.running = True
+        self.on_event(f"Server started at {self.address[0]}:{self.address[1]}. Waiting for connections...")
+        try:
+            while self.running:
+                for key, mask in self.sel.select(timeout=1.0):
+                    if key.fileobj is self.listener:
+                        self._accept()
+                    elif key.fileobj is self.wake_r:
+                        self._drain_wakeups()
+                    else:
+                        conn = key.data
+                        if mask & selectors.EVENT_READ:
+                            self._read(conn)
+                        if mask & selectors.EVENT_WRITE and conn.sock.fileno() != -1:
+                            self._write(conn)
+        finally:
+            for conn in list(self.connections.values()):
+                self._close(conn, announce=False)
+            self.sel.close()
+            self.listener.close()
+            self.wake_r.close()
+            self.wake_w.close()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, addr = self.listener.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = Connection(sock, addr)
+            self.connections[sock] = conn
+            self.sel.register(sock, selectors.EVENT_READ, conn)
+            self.on_event(f"Connected to {addr[0]}:{addr[1]}")
+
+    def _drain_wakeups(self):
+        try:
+            while self.wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self.outgoing:
+            data = self.outgoing.popleft()
+            for conn in list(self.connections.values()):
+                self._queue(conn, data)
+
+    def _read(self, conn):
+        try:
+            n = conn.reader.recv_from(conn.sock)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            n = 0
+        if not n:
+            self._close(conn)
+            return
+        try:
+            frames, raw = conn.reader.pop_frames()
+        except ValueError as e:
+            self.on_event(f"{conn.addr[0]}:{conn.addr[1]} sent a bad frame: {e}")
+            self._close(conn)
+            return
+        if not frames:
+            return
+        if self.on_frames:
+            self.on_frames(conn.addr, frames)
+        else:
+            for msg_type, payload in frames:
+                self.on_message(conn.addr, msg_type, payload)
+        # Relay the complete frames as one write per peer.
+        for other in list(self.connections.values()):
+            if other is not conn:
+                self._queue(other, raw)
+
+    def _queue(self, conn, data):
+        if len(conn.outbuf) + len(data) > MAX_OUTBUF:
+            self._close(conn)
+            return
+        was_empty = not conn.outbuf
+        conn.outbuf += data
+        if was_empty:
+            # Try right away; only wait for EVENT_WRITE if the kernel buffer is full.
+            self._write(conn)
+
+    def _write(self, conn):
+        try:
+            sent = conn.sock.send(conn.outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(conn)
+            return
+        del conn.outbuf[:sent]
+        writing = bool(conn.outbuf)
+        if writing != conn.writing:
+            conn.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.sel.modify(conn.sock, events, conn)
+
+    def _close(self, conn, announce=True):
+        if self.connections.pop(conn.sock, None) is None:
+            return
+        try:
+            self.sel.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.sock.close()
+        if announce:
+            self.on_event(f"{conn.addr[0]}:{conn.addr[1]} disconnected.")
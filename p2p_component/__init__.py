@@ -0,0 +1,53 @@
+# p2p_component: the WebRTC + AES-GCM chat as a bidirectional Streamlit component.
+#
+# The frontend is a static bundle (p2p_component/frontend) served by Streamlit,
+# so the browser caches it and the iframe is mounted once per `key`. Reruns only
+# send the changed props (room, password, settings) to the live page; the
+# RTCPeerConnection, data channel and WebSocket survive widget interaction.
+
+import json
+import os
+
+import streamlit.components.v1 as components
+
+import rerun_profile
+
+from p2p_component.telemetry import show_telemetry
+
+__all__ = ["SIGNALING_URL", "p2p_chat", "show_telemetry"]
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component_func = components.declare_component("p2p_chat", path=_FRONTEND_DIR)
+
+# Local signaling server (python signaling_server.py)
+SIGNALING_URL = os.environ.get("SIGNALING_URL", "ws://localhost:8765")
+
+
+def p2p_chat(room, password, signaling_url=SIGNALING_URL, show_password=False,
+             theme_toggle=False, scrollback=5000, keep_history=False, relay=False,
+             ice_servers=None, compress=False, unordered=False, legacy_peers=False, telemetry_interval=None, height=500,
+             key="p2p_chat"):
+    # With telemetry_interval (seconds) the return value is the latest connection
+    # sample (see telemetry.py); every sample reruns the script, so keep it coarse.
+    # legacy_peers=True lets a peer that never answers the key exchange (an older
+    # page) be talked to under the password key; the page says so when it happens.
+    props = dict(
+        room=room,
+        password=password,
+        signaling_url=signaling_url,
+        show_password=show_password,
+        theme_toggle=theme_toggle,
+        scrollback=scrollback,
+        keep_history=keep_history,
+        relay=relay,
+        ice_servers=ice_servers,
+        compress=compress,
+        unordered=unordered,
+        legacy_peers=legacy_peers,
+        telemetry_interval=telemetry_interval,
+        height=height,
+    )
+    if rerun_profile.active():
+        rerun_profile.size("component props", len(json.dumps(props)))
+    with rerun_profile.phase("component"):
+        return _component_func(**props, key=key, default=None)
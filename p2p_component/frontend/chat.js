@@ -0,0 +1,409 @@
+// WebRTC session: signaling, peer connection and encrypted data channel.
+// Lives for as long as the component iframe, independent of Streamlit reruns.
+
+import { getKey } from "./crypto.js";
+import {
+    sealFrame, openFrame, unpackBatch, compressPayload, inflate,
+    FLAG_BATCH, FLAG_CONTROL, FLAG_CHUNK, FLAG_HISTORY, FLAG_HANDSHAKE, FLAG_DEFLATE,
+} from "./frame.js";
+import { SendQueue } from "./sendqueue.js";
+import { FileTransfers } from "./filetransfer.js";
+import { HistorySync } from "./historylog.js";
+import { Session } from "./handshake.js";
+import { Outbox, isDataFrame } from "./outbox.js";
+import { UnorderedLink, UNORDERED_LABEL, MAX_RETRANSMITS } from "./unordered.js";
+import { summarizeStats } from "./telemetry.js";
+
+const ICE_SERVERS = [{ urls: "stun:stun.l.google.com:19302" }];
+const CANDIDATE_BATCH_MS = 20;
+// Pages from before the handshake never send a hello; fall back to the room key.
+const HANDSHAKE_TIMEOUT_MS = 5000;
+// "disconnected" often heals by itself; give it this long before restarting ICE.
+const DISCONNECT_GRACE_MS = 2000;
+const RECOVERY_TIMEOUT_MS = 30000;
+const SIGNALING_RETRY_MS = 500;
+const SIGNALING_RETRY_MAX_MS = 8000;
+
+let config = {
+    room: null, password: null, signalingUrl: null, keepHistory: false, relay: false, iceServers: ICE_SERVERS, compress: false,
+    unordered: false, legacyPeers: false,
+};
+let key, pc, channel, ws, queue, peerId, session, forceRecovery;
+let sendSeq = 0;
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+// Timings of the last start(), in milliseconds. `phases` holds the first time
+// each setup step completed, relative to start(); benchmarks/ttfm.py reads it.
+// recoveryMs is the last interruption-to-reconnected time.
+export const metrics = {
+    keyWaitMs: null, startedAt: null, phases: {}, recoveryMs: null, recoveries: 0, decryptFailures: 0,
+};
+
+function mark(phase) {
+    if (metrics.phases[phase] == null) metrics.phases[phase] = performance.now() - metrics.startedAt;
+}
+
+// Outlives individual connections so uploads can resume after a reconnect.
+export const files = new FileTransfers();
+
+// Optional local log; replays missed lines to (and from) late joiners.
+export const history = new HistorySync();
+
+// Unacknowledged chat frames, resent after a recovery. Off in relay rooms,
+// where one channel carries every sender's sequence numbers.
+export const outbox = new Outbox();
+
+// Chat lines on an unordered channel with app-level acks (opt-in, set up by the host).
+export const unordered = new UnorderedLink();
+
+export const events = {
+    onMessage: (who, text) => {},
+    onStatus: text => {},
+    onTyping: () => {},
+};
+
+// Apply new props. Returns true when the session had to be torn down.
+// Options other than `relay` apply without reconnecting (iceServers and unordered from the next start()).
+export function configure(room, password, signalingUrl, {
+    keepHistory = false, relay = false, iceServers = null, compress = false, unordered = false, legacyPeers = false,
+} = {}) {
+    config.iceServers = iceServers ?? ICE_SERVERS;
+    config.compress = compress;
+    config.unordered = unordered;
+    config.legacyPeers = legacyPeers;
+    if (keepHistory !== config.keepHistory) {
+        config.keepHistory = keepHistory;
+        if (!keepHistory) history.disable();
+    }
+    const changed = room !== config.room || password !== config.password || signalingUrl !== config.signalingUrl
+        || relay !== config.relay;
+    if (!changed) return false;
+    // Start deriving now so the key is usually ready before Host/Join is clicked.
+    if (password) getKey(password).catch(err => console.error("Key derivation failed:", err));
+    const hadSession = !!pc;
+    teardown();
+    outbox.clear();
+    config = { ...config, room, password, signalingUrl, relay };
+    return hadSession;
+}
+
+export function teardown() {
+    if (channel) channel.close();
+    if (pc) pc.close();
+    if (ws) ws.close();
+    unordered.detach();
+    channel = pc = ws = queue = session = forceRecovery = null;
+}
+
+// In relay mode every page offers to the relay (relay.py), which forwards frames to the rest of the room.
+export async function start(isHost) {
+    teardown();
+    const { room, password, signalingUrl, keepHistory, relay, iceServers } = config;
+    metrics.startedAt = performance.now();
+    metrics.phases = {};
+    peerId = Array.from(crypto.getRandomValues(new Uint8Array(8)), b => b.toString(16).padStart(2, "0")).join("");
+    sendSeq = 0;
+    outbox.reset();
+    key = await getKey(password);
+    mark("key");
+    metrics.keyWaitMs = metrics.phases.key;
+    history.setKey(key);
+    if (keepHistory) await history.enable(await logName(room, password), key);
+    const conn = (pc = new RTCPeerConnection({ iceServers }));
+    conn.onicegatheringstatechange = () => conn.iceGatheringState === "complete" && mark("iceGathered");
+    conn.onconnectionstatechange = () => conn.connectionState === "connected" && mark("connected");
+
+    // Anything signalled while the socket is (re)connecting is sent once it opens.
+    const unsent = [];
+    const signal = msg => {
+        const raw = JSON.stringify({ room, from: peerId, ...msg });
+        if (pc === conn && ws.readyState === WebSocket.OPEN) ws.send(raw);
+        else unsent.push(raw);
+    };
+
+    // The server replays a cached offer and its candidates right after we
+    // subscribe; handle them in order so no candidate beats the offer.
+    let signals = Promise.resolve();
+    const onSignal = async data => {
+        if (data.room !== room || (data.to && data.to !== peerId)) return;
+        if (data.type === "offer") {
+            if (data.relay || relay || conn.signalingState !== "stable" || isHost) return;
+            await conn.setRemoteDescription(new RTCSessionDescription(data.offer));
+            const answer = await conn.createAnswer();
+            await conn.setLocalDescription(answer);
+            signal({ type: "answer", to: data.from, answer });
+            mark("negotiated");
+        } else if (data.type === "answer") {
+            if (conn.signalingState !== "have-local-offer") return;
+            await conn.setRemoteDescription(new RTCSessionDescription(data.answer));
+            mark("negotiated");
+            // A restart on a path that never broke does not change the ICE state.
+            if (recovery && ["connected", "completed"].includes(conn.iceConnectionState)) recovered();
+        } else if (data.type === "candidates" || data.type === "candidate") {
+            for (const c of data.candidates ?? [data.candidate]) {
+                try { await conn.addIceCandidate(new RTCIceCandidate(c)); } catch {}
+            }
+        }
+    };
+
+    // Signaling stays up for the life of the peer connection: an ICE restart needs it.
+    const openSignaling = (retryMs = SIGNALING_RETRY_MS) => {
+        const socket = (ws = new WebSocket(signalingUrl + "/" + encodeURIComponent(room)));
+        socket.onopen = () => {
+            mark("signaling");
+            retryMs = SIGNALING_RETRY_MS;
+            for (const raw of unsent.splice(0)) socket.send(raw);
+        };
+        socket.onmessage = e => {
+            signals = signals.then(() => onSignal(JSON.parse(e.data))).catch(err => console.error("Signaling:", err));
+        };
+        socket.onerror = e => console.error("WebSocket error:", e);
+        socket.onclose = () => {
+            if (pc !== conn || ws !== socket) return;
+            setTimeout(() => pc === conn && openSignaling(Math.min(2 * retryMs, SIGNALING_RETRY_MAX_MS)), retryMs);
+        };
+    };
+    openSignaling();
+
+    // Trickle ICE in a few batches instead of one message per candidate.
+    let candidates = [];
+    let flushTimer = null;
+    const flushCandidates = () => {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+        if (!candidates.length) return;
+        signal({ type: "candidates", to: relay ? "relay" : undefined, candidates });
+        candidates = [];
+    };
+    conn.onicecandidate = e => {
+        if (!e.candidate) return flushCandidates();  // gathering finished
+        candidates.push(e.candidate);
+        if (!flushTimer) flushTimer = setTimeout(flushCandidates, CANDIDATE_BATCH_MS);
+    };
+    conn.ondatachannel = e => {
+        if (e.channel.label === UNORDERED_LABEL) return setupUnordered(e.channel);
+        channel = e.channel;
+        setup();
+    };
+
+    // Network change: the host restarts ICE on the same connection, so the data
+    // channel, session key and sequence numbers survive. The relay (aiortc)
+    // cannot restart ICE; relay rooms only recover if the path comes back by itself.
+    let recovery = null;
+    const restartIce = async () => {
+        if (pc !== conn || !recovery || conn.signalingState !== "stable") return;
+        const offer = await conn.createOffer({ iceRestart: true });
+        await conn.setLocalDescription(offer);
+        signal({ type: "offer", restart: true, offer });
+    };
+    const interrupted = failed => {
+        if (!recovery) {
+            recovery = { since: performance.now(), restartTimer: null, giveUpTimer: setTimeout(giveUp, RECOVERY_TIMEOUT_MS) };
+            outbox.hold();
+            events.onStatus("Connection interrupted, reconnecting...");
+        }
+        if (!isHost || relay) return;
+        clearTimeout(recovery.restartTimer);
+        recovery.restartTimer = setTimeout(restartIce, failed ? 0 : DISCONNECT_GRACE_MS);
+    };
+    const recovered = () => {
+        clearTimeout(recovery.restartTimer);
+        clearTimeout(recovery.giveUpTimer);
+        metrics.recoveryMs = performance.now() - recovery.since;
+        metrics.recoveries++;
+        recovery = null;
+        outbox.resume();
+        events.onStatus(`Reconnected after ${metrics.recoveryMs.toFixed(0)} ms.`);
+    };
+    const giveUp = () => {
+        if (pc !== conn) return;
+        recovery = null;
+        outbox.release();
+        events.onStatus("Connection lost. Press Host or Join to reconnect.");
+    };
+    conn.oniceconnectionstatechange = () => {
+        const state = conn.iceConnectionState;
+        if (state === "disconnected" || state === "failed") interrupted(state === "failed");
+        else if ((state === "connected" || state === "completed") && recovery) recovered();
+    };
+    forceRecovery = () => pc === conn && interrupted(true);
+
+    if (isHost || relay) {
+        channel = conn.createDataChannel("chat");
+        setup();
+        // The relay forwards one channel only.
+        if (config.unordered && !relay) {
+            setupUnordered(conn.createDataChannel(UNORDERED_LABEL, { ordered: false, maxRetransmits: MAX_RETRANSMITS }));
+        }
+        const offer = await conn.createOffer();
+        await conn.setLocalDescription(offer);
+        signal({ type: "offer", relay, offer });
+        mark("offerSent");
+    }
+    const keyNote = ` (key ready after ${metrics.keyWaitMs.toFixed(1)} ms)`;
+    const what = relay ? "Connecting through relay..." : isHost ? "Hosting, waiting for peer..." : "Joining...";
+    events.onStatus(what + keyNote);
+}
+
+// Run the recovery path as if the network had failed (benchmarks/ttfm.py).
+export function recover() {
+    forceRecovery?.();
+}
+
+function setup() {
+    channel.binaryType = "arraybuffer";
+    // Through the relay every page must read every frame, so relay rooms stay on the room key.
+    session = config.relay ? null : new Session(key, channel, { allowFallback: config.legacyPeers });
+    queue = new SendQueue(channel, async (payload, flags) => {
+        const { seq, frame } = await sealNext(payload, flags);
+        if (!config.relay) outbox.sent(seq, frame, payload, flags);
+        return frame;
+    });
+    outbox.attach(queue);
+    files.attach(queue);
+    history.attach(queue);
+    channel.onopen = onOpen;
+    if (channel.readyState === "open") onOpen();
+    channel.onclose = () => events.onStatus("Disconnected.");
+    // Decrypt in arrival order: file chunks and chat lines must not be reordered.
+    let inbox = Promise.resolve();
+    channel.onmessage = e => {
+        inbox = inbox.then(() => receive(e.data)).catch(err => console.error("Receive failed:", err));
+    };
+}
+
+// Both channels share one sequence space, so frames never reuse a (key, seq) pair.
+async function sealNext(payload, flags) {
+    if (config.compress) ({ payload, flags } = await compressPayload(payload, flags));
+    const seq = sendSeq++;
+    return { seq, frame: await (session ? session.seal(payload, seq, flags) : sealFrame(key, payload, seq, flags)) };
+}
+
+// Frames that fail to open are counted and reported like on the reliable
+// channel; the lane drops them and the sender resends messages.
+function setupUnordered(lane) {
+    unordered.attach(lane, async payload => (await sealNext(payload, 0)).frame, async data => {
+        const current = session;
+        await current?.ready;  // the hello travels on the reliable channel and may arrive later
+        const frame = current ? await current.open(data) : await openFrame(key, data);
+        return frame.flags & FLAG_DEFLATE ? inflate(frame.payload) : frame.payload;
+    });
+    unordered.onMessage = bytes => {
+        const text = decoder.decode(bytes);
+        mark("firstMessage");
+        history.record(false, text);
+        events.onMessage("peer", text);
+    };
+    unordered.onEphemeral = msg => msg.type === "typing" && events.onTyping();
+    unordered.onError = kind => {
+        if (kind === "decrypt") metrics.decryptFailures++;
+        events.onMessage("peer", kind === "decrypt" ? "[decryption failed]" : "[malformed message]");
+    };
+}
+
+function onOpen() {
+    mark("channelOpen");
+    events.onStatus("Connected.");
+    if (session) {
+        const current = session;
+        current.start();
+        setTimeout(() => {
+            if (current !== session || current.receiving) return;
+            events.onStatus(current.fallback()
+                ? "Connected WITHOUT a session key: the peer did not answer the key exchange, so messages use the password key."
+                : "Waiting for the peer's key exchange; messages are held until it completes.");
+        }, HANDSHAKE_TIMEOUT_MS);
+        current.ready.then(() => {
+            if (current !== session || current.setupMs === null) return;
+            mark("handshake");
+            events.onStatus(`Connected (session key in ${current.setupMs.toFixed(1)} ms).`);
+        });
+    }
+    const requeued = outbox.requeue();
+    if (requeued) events.onStatus(`Connected. Resending ${requeued} unacknowledged frame(s).`);
+    files.resumePending();
+    history.hello();
+}
+
+async function receive(data) {
+    let frame;
+    try {
+        const bytes = new Uint8Array(data);
+        if (!config.relay && !outbox.fresh(bytes)) return;  // resent after a recovery, already shown
+        frame = session ? await session.open(bytes) : await openFrame(key, bytes);
+    } catch {
+        metrics.decryptFailures++;
+        events.onMessage("peer", "[decryption failed]");
+        return;
+    }
+    if (frame.flags & FLAG_DEFLATE) {
+        try {
+            frame.payload = await inflate(frame.payload);
+        } catch {
+            events.onMessage("peer", "[could not decompress message]");
+            return;
+        }
+    }
+    if (frame.flags & FLAG_HANDSHAKE) return session?.accept(frame.payload);
+    if (!config.relay && isDataFrame(frame.flags)) outbox.delivered(frame.seq);
+    if (frame.flags & FLAG_CHUNK) return files.handleChunk(frame.payload);
+    if (frame.flags & FLAG_HISTORY) return history.handleBatch(unpackBatch(frame.payload));
+    if (frame.flags & FLAG_CONTROL) return handleControl(JSON.parse(decoder.decode(frame.payload)));
+    const messages = frame.flags & FLAG_BATCH ? unpackBatch(frame.payload) : [frame.payload];
+    for (const m of messages) {
+        const text = decoder.decode(m);
+        mark("firstMessage");
+        history.record(false, text);
+        events.onMessage("peer", text);
+    }
+}
+
+function handleControl(msg) {
+    if (msg.type.startsWith("file-")) files.handleControl(msg);
+    else if (msg.type.startsWith("history-")) history.handleControl(msg);
+    else if (msg.type.startsWith("outbox-")) outbox.handleControl(msg);
+}
+
+// One log per room and password, so a password change starts a fresh log.
+async function logName(room, password) {
+    const digest = await crypto.subtle.digest("SHA-256", encoder.encode(`history\0${room}\0${password}`));
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+export function sendFile(file) {
+    if (!channel || channel.readyState !== "open") return false;
+    files.send(file);
+    return true;
+}
+
+export async function send(text) {
+    if (!channel || channel.readyState !== "open") return false;
+    if (unordered.ready) unordered.send(encoder.encode(text));
+    else queue.push(encoder.encode(text));
+    history.record(true, text);
+    events.onMessage("you", text);
+    return true;
+}
+
+// Connection telemetry for the Streamlit script; null before start().
+export async function snapshot() {
+    if (!pc) return null;
+    return {
+        room: config.room,
+        mode: config.relay ? "relay" : config.unordered ? "unordered" : "direct",
+        connectionState: pc.connectionState,
+        ...summarizeStats(await pc.getStats()),
+        bufferedAmount: channel?.bufferedAmount ?? 0,
+        unacked: outbox.entries.length + unordered.inflight.size,
+        retransmits: unordered.stats.retransmits,
+        decryptFailures: metrics.decryptFailures,
+        recoveries: metrics.recoveries,
+        keyWaitMs: metrics.keyWaitMs,
+    };
+}
+
+// Typing indicator; fire-and-forget, so only on the unordered lane.
+export function typing() {
+    return unordered.sendEphemeral({ type: "typing" });
+}
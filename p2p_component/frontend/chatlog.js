@@ -0,0 +1,177 @@
+// Append-only, virtualized chat log.
+//
+// Messages are kept as plain records; only the rows inside the viewport (plus
+// a few rows of overscan) exist as DOM nodes. Spacer divs above and below the
+// rendered rows stand in for the rest, using measured row heights where known
+// and an estimate otherwise. Records older than `scrollback` are dropped.
+// Heights live in a Fenwick tree, so a flush costs O(visible rows + log n)
+// instead of a walk over the whole scrollback.
+
+// Row heights with prefix sums and offset lookups in O(log n).
+class Heights {
+    constructor(values = []) {
+        this.rebuild(values);
+    }
+
+    get length() {
+        return this.values.length;
+    }
+
+    get(i) {
+        return this.values[i];
+    }
+
+    rebuild(values) {
+        this.values = values;
+        this.tree = [0, ...values];
+        for (let i = 1; i < this.tree.length; i++) {
+            const parent = i + (i & -i);
+            if (parent < this.tree.length) this.tree[parent] += this.tree[i];
+        }
+    }
+
+    push(height) {
+        this.values.push(height);
+        const i = this.values.length;
+        // Node i covers (i - lowbit(i), i].
+        this.tree.push(height + this.sum(i - 1) - this.sum(i - (i & -i)));
+    }
+
+    set(i, height) {
+        const delta = height - this.values[i];
+        if (!delta) return;
+        this.values[i] = height;
+        for (let j = i + 1; j < this.tree.length; j += j & -j) this.tree[j] += delta;
+    }
+
+    // Total height of rows [0, i).
+    sum(i) {
+        let total = 0;
+        for (; i > 0; i -= i & -i) total += this.tree[i];
+        return total;
+    }
+
+    // Largest i with sum(i) <= offset: the index of the row containing `offset`.
+    find(offset) {
+        let i = 0;
+        let step = 1;
+        while (step * 2 < this.tree.length) step *= 2;
+        for (; step; step >>= 1) {
+            if (i + step < this.tree.length && this.tree[i + step] <= offset) {
+                i += step;
+                offset -= this.tree[i];
+            }
+        }
+        return i;
+    }
+}
+
+export class ChatLog {
+    constructor(container, renderItem, { scrollback = 5000, estimatedHeight = 36, overscan = 8 } = {}) {
+        this.container = container;
+        this.renderItem = renderItem;
+        this.scrollback = scrollback;
+        this.estimatedHeight = estimatedHeight;
+        this.overscan = overscan;
+        this.items = [];
+        this.heights = new Heights();
+        this.nodes = new Map();
+        this.stick = true;
+        this.scheduled = false;
+
+        this.topSpacer = document.createElement("div");
+        this.rows = document.createElement("div");
+        this.bottomSpacer = document.createElement("div");
+        container.replaceChildren(this.topSpacer, this.rows, this.bottomSpacer);
+        container.addEventListener("scroll", () => {
+            this.stick = container.scrollHeight - container.scrollTop - container.clientHeight < 4;
+            this.schedule();
+        });
+    }
+
+    setScrollback(scrollback) {
+        this.scrollback = scrollback;
+        this.trim();
+        this.schedule();
+    }
+
+    append(item) {
+        this.items.push(item);
+        this.heights.push(this.estimatedHeight);
+        this.trim();
+        this.schedule();
+    }
+
+    clear() {
+        this.items = [];
+        this.heights = new Heights();
+        this.refresh();
+    }
+
+    // Rebuild the visible rows, e.g. after the row template changed.
+    refresh() {
+        this.nodes.clear();
+        this.rows.replaceChildren();
+        this.schedule();
+    }
+
+    // Drop old records in chunks so trimming stays amortized O(1) per append.
+    trim() {
+        const excess = this.items.length - this.scrollback;
+        if (excess > Math.max(1, this.scrollback >> 2)) {
+            this.items.splice(0, excess);
+            this.heights.rebuild(this.heights.values.slice(excess));
+            this.nodes.clear();
+            this.rows.replaceChildren();
+        }
+    }
+
+    schedule() {
+        if (this.scheduled) return;
+        this.scheduled = true;
+        requestAnimationFrame(() => this.flush());
+    }
+
+    // Render synchronously (used by the rAF callback and by benchmarks).
+    flush() {
+        this.scheduled = false;
+        const { container, items, heights, overscan } = this;
+        const start = Math.max(0, items.length - this.scrollback);
+        const base = heights.sum(start);
+        const total = heights.sum(items.length) - base;
+        const viewTop = this.stick ? Math.max(0, total - container.clientHeight) : container.scrollTop;
+        const viewBottom = viewTop + container.clientHeight;
+
+        let i = Math.min(items.length, Math.max(start, heights.find(base + viewTop)));
+        let offset = heights.sum(i) - base;
+        let from = i;
+        let fromOffset = offset;
+        for (let k = 0; k < overscan && from > start; k++) fromOffset -= heights.get(--from);
+        while (i < items.length && offset < viewBottom) offset += heights.get(i++);
+        const to = Math.min(items.length, i + overscan);
+
+        for (const index of this.nodes.keys()) {
+            if (index < from || index >= to) this.nodes.delete(index);
+        }
+        const visible = [];
+        for (let j = from; j < to; j++) {
+            let node = this.nodes.get(j);
+            if (!node) {
+                node = document.createElement("div");
+                node.style.display = "flow-root";
+                node.appendChild(this.renderItem(items[j]));
+                this.nodes.set(j, node);
+            }
+            visible.push(node);
+        }
+        this.rows.replaceChildren(...visible);
+
+        for (let j = from; j < to; j++) {
+            heights.set(j, this.nodes.get(j).offsetHeight || this.estimatedHeight);
+        }
+        const below = heights.sum(items.length) - heights.sum(to);
+        this.topSpacer.style.height = fromOffset + "px";
+        this.bottomSpacer.style.height = below + "px";
+        if (this.stick) container.scrollTop = container.scrollHeight;
+    }
+}
@@ -0,0 +1,75 @@
+// Session key derivation for the chat frontend (frames are in frame.js).
+
+export const SALT = "p2p-chat";
+export const ITERATIONS = 50000;
+
+// Derived keys cached per (password, salt) for the page session. The cache
+// holds promises, so a Host/Join click during a running derivation just waits
+// for it instead of starting a second one.
+const keyCache = new Map();
+let worker = null;
+let nextId = 0;
+const pending = new Map();
+
+function getWorker() {
+    if (worker === null) {
+        try {
+            worker = new Worker(new URL("./kdf-worker.js", import.meta.url));
+            worker.onmessage = e => {
+                const { id, key, error } = e.data;
+                const { resolve, reject } = pending.get(id);
+                pending.delete(id);
+                error ? reject(new Error(error)) : resolve(key);
+            };
+            worker.onerror = () => {
+                // Worker could not load: finish outstanding requests on the main thread.
+                worker = undefined;
+                for (const [id, { resolve, reject, pwd, salt }] of pending) {
+                    deriveOnMainThread(pwd, salt).then(resolve, reject);
+                    pending.delete(id);
+                }
+            };
+        } catch {
+            worker = undefined;
+        }
+    }
+    return worker;
+}
+
+async function deriveOnMainThread(pwd, salt) {
+    const enc = new TextEncoder();
+    const baseKey = await crypto.subtle.importKey("raw", enc.encode(pwd), "PBKDF2", false, ["deriveKey"]);
+    return crypto.subtle.deriveKey(
+        { name: "PBKDF2", salt: enc.encode(salt), iterations: ITERATIONS, hash: "SHA-256" },
+        baseKey,
+        { name: "AES-GCM", length: 256 },
+        false,
+        ["encrypt", "decrypt"]
+    );
+}
+
+export function deriveKey(pwd, salt = SALT) {
+    const w = getWorker();
+    if (!w) return deriveOnMainThread(pwd, salt);
+    const id = nextId++;
+    return new Promise((resolve, reject) => {
+        pending.set(id, { resolve, reject, pwd, salt });
+        w.postMessage({ id, password: pwd, salt, iterations: ITERATIONS });
+    });
+}
+
+async function cacheId(pwd, salt) {
+    // Hash so the password itself is never used as a map key.
+    const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(salt + "\0" + pwd));
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+export async function getKey(pwd, salt = SALT) {
+    const id = await cacheId(pwd, salt);
+    if (!keyCache.has(id)) {
+        const promise = deriveKey(pwd, salt);
+        keyCache.set(id, promise);
+        promise.catch(() => keyCache.delete(id));
+    }
+    return keyCache.get(id);
+}
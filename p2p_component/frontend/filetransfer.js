@@ -0,0 +1,136 @@
+// Chunked, resumable file transfer over the encrypted data channel.
+//
+// Files are read one slice at a time and each chunk is sealed as its own
+// frame (own IV) sized to stay within the 16 KiB SCTP message size every
+// browser accepts. Uploads wait on SendQueue.ready(), so at most one chunk
+// plus the channel's high-water mark is held in memory on the sending side;
+// received chunks go straight into Blob parts.
+//
+// Control messages (FLAG_CONTROL, JSON):
+//   file-offer  {id, name, size, mime, chunks}   sender -> receiver
+//   file-accept {id, next}                        receiver -> sender, resume point
+//   file-ack    {id, next}                        every ACK_EVERY chunks
+//   file-done   {id}
+// Chunks (FLAG_CHUNK): [uint32 id][uint32 index][data].
+
+import { FLAG_CONTROL, FLAG_CHUNK, HEADER_SIZE, TAG_SIZE } from "./frame.js";
+
+export const MAX_FRAME_SIZE = 16 * 1024;
+export const CHUNK_HEADER_SIZE = 8;
+export const CHUNK_SIZE = MAX_FRAME_SIZE - HEADER_SIZE - TAG_SIZE - CHUNK_HEADER_SIZE;
+const ACK_EVERY = 16;
+const MERGE_PARTS_EVERY = 64;
+
+const encoder = new TextEncoder();
+
+export class FileTransfers {
+    constructor() {
+        this.queue = null;
+        this.outgoing = new Map();
+        this.incoming = new Map();
+        this.onProgress = (direction, name, done, total) => {};
+        this.onFile = (name, blob) => {};
+    }
+
+    // Bind to the send queue of a (re)opened channel.
+    attach(queue) {
+        this.queue = queue;
+        for (const upload of this.outgoing.values()) upload.sending = false;
+    }
+
+    sendControl(msg) {
+        this.queue.push(encoder.encode(JSON.stringify(msg)), FLAG_CONTROL);
+    }
+
+    send(file) {
+        const id = crypto.getRandomValues(new Uint32Array(1))[0];
+        const upload = { file, chunks: Math.max(1, Math.ceil(file.size / CHUNK_SIZE)), acked: 0, sending: false };
+        this.outgoing.set(id, upload);
+        this.offer(id, upload);
+        return id;
+    }
+
+    offer(id, upload) {
+        const { name, size, type } = upload.file;
+        this.sendControl({ type: "file-offer", id, name, size, mime: type, chunks: upload.chunks });
+    }
+
+    // Re-offer unfinished uploads after a reconnect; the receiver answers with
+    // the chunk it needs next, so nothing it already has is sent again.
+    resumePending() {
+        for (const [id, upload] of this.outgoing) this.offer(id, upload);
+    }
+
+    async upload(id, upload, from) {
+        if (upload.sending) return;
+        upload.sending = true;
+        const queue = this.queue;
+        try {
+            for (let index = from; index < upload.chunks; index++) {
+                await queue.ready();
+                // Connection lost: stop here and wait for resumePending().
+                if (queue !== this.queue || queue.channel.readyState !== "open") return;
+                const start = index * CHUNK_SIZE;
+                const data = await upload.file.slice(start, start + CHUNK_SIZE).arrayBuffer();
+                const payload = new Uint8Array(CHUNK_HEADER_SIZE + data.byteLength);
+                const view = new DataView(payload.buffer);
+                view.setUint32(0, id);
+                view.setUint32(4, index);
+                payload.set(new Uint8Array(data), CHUNK_HEADER_SIZE);
+                queue.push(payload, FLAG_CHUNK);
+            }
+        } finally {
+            upload.sending = false;
+        }
+    }
+
+    handleControl(msg) {
+        if (msg.type === "file-offer") {
+            let download = this.incoming.get(msg.id);
+            if (!download) {
+                download = { name: msg.name, size: msg.size, mime: msg.mime, chunks: msg.chunks, next: 0, parts: [] };
+                this.incoming.set(msg.id, download);
+            }
+            this.sendControl({ type: "file-accept", id: msg.id, next: download.next });
+        } else if (msg.type === "file-accept") {
+            const upload = this.outgoing.get(msg.id);
+            if (upload) {
+                upload.acked = msg.next;
+                this.upload(msg.id, upload, msg.next);
+            }
+        } else if (msg.type === "file-ack") {
+            const upload = this.outgoing.get(msg.id);
+            if (upload) {
+                upload.acked = msg.next;
+                this.onProgress("send", upload.file.name, msg.next, upload.chunks);
+            }
+        } else if (msg.type === "file-done") {
+            const upload = this.outgoing.get(msg.id);
+            if (upload) {
+                this.outgoing.delete(msg.id);
+                this.onProgress("send", upload.file.name, upload.chunks, upload.chunks);
+            }
+        }
+    }
+
+    handleChunk(payload) {
+        const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+        const id = view.getUint32(0);
+        const index = view.getUint32(4);
+        const download = this.incoming.get(id);
+        // Duplicates from before a resume are dropped; the channel is ordered.
+        if (!download || index !== download.next) return;
+        download.parts.push(new Blob([payload.subarray(CHUNK_HEADER_SIZE)]));
+        download.next++;
+        if (download.parts.length >= MERGE_PARTS_EVERY) download.parts = [new Blob(download.parts)];
+        if (download.next === download.chunks) {
+            this.incoming.delete(id);
+            this.sendControl({ type: "file-done", id });
+            this.onProgress("receive", download.name, download.next, download.chunks);
+            this.onFile(download.name, new Blob(download.parts, { type: download.mime }));
+        } else if (download.next % ACK_EVERY === 0) {
+            this.sendControl({ type: "file-ack", id, next: download.next });
+            this.onProgress("receive", download.name, download.next, download.chunks);
+        }
+    }
+}
@@ -0,0 +1,137 @@
+// Versioned binary frame for encrypted chat messages (see frame_codec.py).
+//
+//   offset  size  field
+//   0       1     version
+//   1       1     flags
+//   2       12    AES-GCM IV
+//   14      4     sequence number (uint32, big-endian)
+//   18      n+16  ciphertext + GCM tag
+//
+// The 18-byte header is authenticated as GCM additional data. Frames are
+// written into one buffer allocated at the final size and parsed with
+// subarray views, so no byte is copied through a temporary JS array.
+
+export const VERSION = 1;
+export const IV_OFFSET = 2;
+export const SEQ_OFFSET = 14;
+export const HEADER_SIZE = 18;
+export const TAG_SIZE = 16;
+
+// flags
+export const FLAG_BATCH = 0x01;    // payload is several length-prefixed messages
+export const FLAG_CONTROL = 0x02;  // payload is a JSON control message
+export const FLAG_CHUNK = 0x04;    // payload is a file chunk (filetransfer.js)
+export const FLAG_HISTORY = 0x08;  // payload is a batch of stored log frames (historylog.js)
+export const FLAG_HANDSHAKE = 0x10;  // ECDH hello, sealed with the room key (handshake.js)
+export const FLAG_SESSION = 0x20;  // sealed with a session key instead of the room key
+export const FLAG_DEFLATE = 0x40;  // payload is deflate-raw compressed before sealing
+
+// Smaller payloads are sent as-is: deflate would cost latency and save little.
+export const COMPRESS_MIN = 1024;
+// Refuse payloads that inflate beyond this (decompression bombs).
+export const MAX_INFLATED = 16 * 1024 * 1024;
+
+export async function sealFrame(key, payload, seq, flags = 0) {
+    const frame = new Uint8Array(HEADER_SIZE + payload.byteLength + TAG_SIZE);
+    frame[0] = VERSION;
+    frame[1] = flags;
+    const iv = crypto.getRandomValues(frame.subarray(IV_OFFSET, SEQ_OFFSET));
+    new DataView(frame.buffer).setUint32(SEQ_OFFSET, seq);
+    const header = frame.subarray(0, HEADER_SIZE);
+    const ciphertext = await crypto.subtle.encrypt({ name: "AES-GCM", iv, additionalData: header }, key, payload);
+    frame.set(new Uint8Array(ciphertext), HEADER_SIZE);
+    return frame;
+}
+
+export function parseFrame(data) {
+    if (data.byteLength < HEADER_SIZE + TAG_SIZE) throw new Error("frame too short");
+    if (data[0] !== VERSION) throw new Error(`unsupported frame version ${data[0]}`);
+    return {
+        version: data[0],
+        flags: data[1],
+        seq: new DataView(data.buffer, data.byteOffset, data.byteLength).getUint32(SEQ_OFFSET),
+        header: data.subarray(0, HEADER_SIZE),
+        iv: data.subarray(IV_OFFSET, SEQ_OFFSET),
+        ciphertext: data.subarray(HEADER_SIZE),
+    };
+}
+
+export async function openFrame(key, data) {
+    const frame = parseFrame(data);
+    const plaintext = await crypto.subtle.decrypt(
+        { name: "AES-GCM", iv: frame.iv, additionalData: frame.header }, key, frame.ciphertext
+    );
+    return { flags: frame.flags, seq: frame.seq, payload: new Uint8Array(plaintext) };
+}
+
+// Batch payload: repeated [uint32 length][message bytes].
+export function packBatch(messages) {
+    let size = 0;
+    for (const m of messages) size += 4 + m.byteLength;
+    const out = new Uint8Array(size);
+    const view = new DataView(out.buffer);
+    let offset = 0;
+    for (const m of messages) {
+        view.setUint32(offset, m.byteLength);
+        out.set(m, offset + 4);
+        offset += 4 + m.byteLength;
+    }
+    return out;
+}
+
+export function unpackBatch(payload) {
+    const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+    const messages = [];
+    let offset = 0;
+    while (offset < payload.byteLength) {
+        const length = view.getUint32(offset);
+        offset += 4;
+        if (offset + length > payload.byteLength) throw new Error("truncated batch");
+        messages.push(payload.subarray(offset, offset + length));
+        offset += length;
+    }
+    return messages;
+}
+
+function streamBytes(bytes, transform) {
+    return new Blob([bytes]).stream().pipeThrough(transform).getReader();
+}
+
+export async function deflate(bytes) {
+    return readAll(streamBytes(bytes, new CompressionStream("deflate-raw")), Infinity);
+}
+
+export async function inflate(bytes, maxSize = MAX_INFLATED) {
+    return readAll(streamBytes(bytes, new DecompressionStream("deflate-raw")), maxSize);
+}
+
+async function readAll(reader, maxSize) {
+    const parts = [];
+    let size = 0;
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        size += value.byteLength;
+        if (size > maxSize) {
+            reader.cancel();
+            throw new Error("inflated payload too large");
+        }
+        parts.push(value);
+    }
+    const out = new Uint8Array(size);
+    let offset = 0;
+    for (const part of parts) {
+        out.set(part, offset);
+        offset += part.byteLength;
+    }
+    return out;
+}
+
+// Deflate payloads of COMPRESS_MIN bytes and up when that makes them smaller.
+// File chunks are skipped: most files are compressed already.
+export async function compressPayload(payload, flags) {
+    if (payload.byteLength < COMPRESS_MIN || flags & FLAG_CHUNK) return { payload, flags };
+    const packed = await deflate(payload);
+    if (packed.byteLength >= payload.byteLength) return { payload, flags };
+    return { payload: packed, flags: flags | FLAG_DEFLATE };
+}
@@ -0,0 +1,163 @@
+// Per-connection session keys: ephemeral ECDH, authenticated with the room key.
+//
+// As soon as the data channel opens each side sends a hello (FLAG_HANDSHAKE)
+// carrying a fresh P-256 public key and nonce, sealed under the password-derived
+// room key, so only someone who knows the password can take part. The shared
+// secret goes through HKDF into one key chain per direction; chat traffic is
+// sealed with those keys (FLAG_SESSION), never with the room key itself.
+//
+// Once session keys exist, frames without FLAG_SESSION are rejected: the room
+// key carries hellos only. A peer that never sends a hello (an older page) is
+// only talked to under the room key when the app allows legacy peers.
+//
+// Rekeying needs no messages: frame `seq` selects epoch seq / REKEY_EVERY, and
+// moving to the next epoch is a single HKDF step. The old chain value is
+// dropped, so keys of earlier epochs cannot be recomputed from memory.
+
+import { sealFrame, openFrame, parseFrame, FLAG_HANDSHAKE, FLAG_SESSION } from "./frame.js";
+
+export const REKEY_EVERY = 4096;
+const CURVE = "P-256";
+const PUBLIC_KEY_SIZE = 65;
+const NONCE_SIZE = 16;
+// A frame may be at most this many epochs ahead; bounds the HKDF work a bad seq can cause.
+const MAX_EPOCH_SKIP = 2;
+const encoder = new TextEncoder();
+
+async function hkdf(baseKey, salt, info) {
+    const bits = await crypto.subtle.deriveBits(
+        { name: "HKDF", hash: "SHA-256", salt, info: encoder.encode(info) }, baseKey, 512
+    );
+    return new Uint8Array(bits);
+}
+
+function importHkdf(bits) {
+    return crypto.subtle.importKey("raw", bits, "HKDF", false, ["deriveBits"]);
+}
+
+function importAes(bits) {
+    return crypto.subtle.importKey("raw", bits, "AES-GCM", false, ["encrypt", "decrypt"]);
+}
+
+function compareBytes(a, b) {
+    for (let i = 0; i < Math.min(a.length, b.length); i++) {
+        if (a[i] !== b[i]) return a[i] - b[i];
+    }
+    return a.length - b.length;
+}
+
+// One direction of a session: the AES key of the current epoch and the chain to the next.
+export class KeyChain {
+    constructor(chain) {
+        this.chain = chain;
+        this.epoch = -1;
+        this.key = null;
+        this.previous = null;
+        this.stepping = Promise.resolve();
+    }
+
+    async step() {
+        const bits = await hkdf(this.chain, new Uint8Array(0), "p2p-chat/v1/step");
+        this.chain = await importHkdf(bits.subarray(0, 32));
+        this.previous = this.key;
+        this.key = await importAes(bits.subarray(32));
+        this.epoch++;
+    }
+
+    // Key of `epoch`; only the current and the previous epoch are kept.
+    keyFor(epoch) {
+        const result = this.stepping.then(async () => {
+            if (epoch > this.epoch + MAX_EPOCH_SKIP) throw new Error(`key epoch ${epoch} is too far ahead`);
+            while (this.epoch < epoch) await this.step();
+            if (epoch === this.epoch) return this.key;
+            if (epoch === this.epoch - 1 && this.previous) return this.previous;
+            throw new Error(`key epoch ${epoch} is gone`);
+        });
+        this.stepping = result.catch(() => {});
+        return result;
+    }
+}
+
+export class Session {
+    constructor(roomKey, channel, { allowFallback = false } = {}) {
+        this.roomKey = roomKey;
+        this.channel = channel;
+        this.allowFallback = allowFallback;
+        this.legacy = false;
+        this.sending = null;
+        this.receiving = null;
+        this.mine = null;
+        this.setupMs = null;
+        this.ready = new Promise(resolve => (this.resolve = resolve));
+    }
+
+    // Generate our ephemeral key and send the hello. Safe to call more than once.
+    start() {
+        if (!this.mine) this.mine = this.sendHello();
+        return this.mine;
+    }
+
+    async sendHello() {
+        this.startedAt = performance.now();
+        const pair = await crypto.subtle.generateKey({ name: "ECDH", namedCurve: CURVE }, false, ["deriveBits"]);
+        const publicKey = new Uint8Array(await crypto.subtle.exportKey("raw", pair.publicKey));
+        const nonce = crypto.getRandomValues(new Uint8Array(NONCE_SIZE));
+        const hello = new Uint8Array(PUBLIC_KEY_SIZE + NONCE_SIZE);
+        hello.set(publicKey);
+        hello.set(nonce, PUBLIC_KEY_SIZE);
+        this.channel.send(await sealFrame(this.roomKey, hello, 0, FLAG_HANDSHAKE));
+        return { pair, publicKey, nonce };
+    }
+
+    // Peer hello (already opened with the room key, so it is authentic).
+    async accept(hello) {
+        if (this.receiving || hello.byteLength !== PUBLIC_KEY_SIZE + NONCE_SIZE) return;
+        const { pair, publicKey, nonce } = await this.start();
+        const theirKey = hello.subarray(0, PUBLIC_KEY_SIZE);
+        const theirNonce = hello.subarray(PUBLIC_KEY_SIZE);
+        const order = compareBytes(publicKey, theirKey);
+        if (order === 0) return;  // our own hello reflected back
+        const peer = await crypto.subtle.importKey("raw", theirKey, { name: "ECDH", namedCurve: CURVE }, false, []);
+        const shared = await crypto.subtle.deriveBits({ name: "ECDH", public: peer }, pair.privateKey, 256);
+        // Both public keys and nonces, lower public key first, bind the keys to this exchange.
+        const [lo, hi] = order < 0 ? [[publicKey, nonce], [theirKey, theirNonce]] : [[theirKey, theirNonce], [publicKey, nonce]];
+        const salt = new Uint8Array(2 * (PUBLIC_KEY_SIZE + NONCE_SIZE));
+        salt.set(lo[0], 0);
+        salt.set(lo[1], PUBLIC_KEY_SIZE);
+        salt.set(hi[0], PUBLIC_KEY_SIZE + NONCE_SIZE);
+        salt.set(hi[1], 2 * PUBLIC_KEY_SIZE + NONCE_SIZE);
+        const bits = await hkdf(await importHkdf(shared), salt, "p2p-chat/v1/session");
+        const loChain = new KeyChain(await importHkdf(bits.subarray(0, 32)));
+        const hiChain = new KeyChain(await importHkdf(bits.subarray(32)));
+        [this.sending, this.receiving] = order < 0 ? [loChain, hiChain] : [hiChain, loChain];
+        this.setupMs = performance.now() - this.startedAt;
+        this.resolve();
+    }
+
+    // No hello from the peer (an older page?): switch to the room key if allowed.
+    // Returns true when it did; otherwise sends keep waiting for the handshake.
+    fallback() {
+        if (this.receiving || !this.allowFallback) return false;
+        this.legacy = true;
+        this.resolve();
+        return true;
+    }
+
+    async seal(payload, seq, flags = 0) {
+        await this.ready;
+        if (!this.sending) return sealFrame(this.roomKey, payload, seq, flags);
+        const key = await this.sending.keyFor(Math.floor(seq / REKEY_EVERY));
+        return sealFrame(key, payload, seq, flags | FLAG_SESSION);
+    }
+
+    async open(data) {
+        const { flags, seq } = parseFrame(data);
+        if (!(flags & FLAG_SESSION)) {
+            if (flags & FLAG_HANDSHAKE || (this.allowFallback && !this.receiving)) return openFrame(this.roomKey, data);
+            throw new Error("frame not sealed with a session key");
+        }
+        // Never wait here: the receive loop is serialized and the peer's hello may be behind us.
+        if (!this.receiving) throw new Error("session frame before handshake");
+        return openFrame(await this.receiving.keyFor(Math.floor(seq / REKEY_EVERY)), data);
+    }
+}
@@ -0,0 +1,250 @@
+// Optional encrypted message log with range replay for late joiners.
+//
+// Every live chat line is sealed under the room key (frame.js, seq = position
+// in the log) and appended to one growing buffer with an offset index, written
+// through to IndexedDB so the log survives a reload; a reloaded log is shown
+// again when it opens. On connect each side announces its log id and length;
+// the other side asks only for the entries it does not have yet, and those
+// stored frames are streamed back in FLAG_HISTORY batches of up to 16 KiB.
+// Replayed entries are appended to the local log as well, and how many entries
+// of each peer log were applied is stored next to the frames, so the count
+// never claims lines the local log does not hold.
+//
+// Control messages (FLAG_CONTROL, JSON):
+//   history-hello   {logId, length}
+//   history-request {logId, from}
+
+import { sealFrame, openFrame, packBatch, FLAG_CONTROL, FLAG_HISTORY } from "./frame.js";
+import { MAX_FRAME_SIZE } from "./filetransfer.js";
+
+const DB_NAME = "p2p-chat-history";
+const AUTHOR_OWNER = 0;  // written on this device
+const AUTHOR_OTHER = 1;  // received from the peer
+const AUTHOR_THIRD = 2;  // replayed from a peer's log, written by someone else
+const LOCAL_WHO = ["you", "peer", "other"];
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+function request(req) {
+    return new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function openDb() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => req.result.createObjectStore("frames");
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+export class HistoryLog {
+    constructor(name, id) {
+        this.name = name;
+        this.id = id;
+        this.data = new Uint8Array(64 * 1024);
+        this.offsets = [0];
+        this.have = new Map();  // peer log id -> entries applied
+        this.db = null;
+    }
+
+    static async open(name) {
+        const idKey = `p2p-history-id:${name}`;
+        let id = localStorage.getItem(idKey);
+        if (!id) {
+            id = Array.from(crypto.getRandomValues(new Uint8Array(8)), b => b.toString(16).padStart(2, "0")).join("");
+            localStorage.setItem(idKey, id);
+        }
+        const log = new HistoryLog(name, id);
+        try {
+            log.db = await openDb();
+            const store = log.db.transaction("frames").objectStore("frames");
+            // Frames are keyed [name, index]; the counters [name, "have:<logId>"] sort after them.
+            const [frames, counts] = await Promise.all([
+                request(store.getAll(IDBKeyRange.bound([name, 0], [name, Infinity]))),
+                request(store.getAll(IDBKeyRange.bound([name, "have:"], [name, "have:\uffff"]))),
+            ]);
+            for (const frame of frames) log.appendBytes(new Uint8Array(frame));
+            for (const { logId, count } of counts) log.have.set(logId, count);
+        } catch (err) {
+            console.warn("History log is memory-only:", err);
+        }
+        return log;
+    }
+
+    get length() {
+        return this.offsets.length - 1;
+    }
+
+    get(index) {
+        return this.data.subarray(this.offsets[index], this.offsets[index + 1]);
+    }
+
+    appendBytes(frame) {
+        const used = this.offsets[this.offsets.length - 1];
+        if (used + frame.byteLength > this.data.byteLength) {
+            const grown = new Uint8Array(Math.max(2 * this.data.byteLength, used + frame.byteLength));
+            grown.set(this.data.subarray(0, used));
+            this.data = grown;
+        }
+        this.data.set(frame, used);
+        this.offsets.push(used + frame.byteLength);
+    }
+
+    append(frame) {
+        const index = this.length;
+        this.appendBytes(frame);
+        if (this.db) {
+            this.db.transaction("frames", "readwrite").objectStore("frames").put(frame.buffer, [this.name, index]);
+        }
+    }
+
+    // Readwrite transactions on one store commit in order, so this lands after the frames it counts.
+    setHave(logId, count) {
+        this.have.set(logId, count);
+        if (this.db) {
+            this.db.transaction("frames", "readwrite").objectStore("frames").put({ logId, count }, [this.name, `have:${logId}`]);
+        }
+    }
+}
+
+export class HistorySync {
+    constructor() {
+        this.log = null;
+        this.key = null;
+        this.queue = null;
+        this.pendingLogId = null;
+        this.recording = Promise.resolve();
+        this.have = new Map();  // counts for peer logs while there is no local log
+        this.shown = new Set();  // local logs already replayed into this page
+        this.onReplay = (who, text) => {};
+    }
+
+    async enable(name, key) {
+        this.key = key;
+        if (this.log && this.log.name === name) return;
+        this.log = await HistoryLog.open(name);
+        if (!this.shown.has(name)) {
+            this.shown.add(name);
+            await this.replayLocal();
+        }
+    }
+
+    // Show what this device already holds: its own lines, and the ones it received or replayed.
+    async replayLocal() {
+        const { log } = this;
+        for (let i = 0; i < log.length; i++) {
+            try {
+                const { payload } = await openFrame(this.key, log.get(i).slice());
+                this.onReplay(LOCAL_WHO[payload[0]] ?? "other", decoder.decode(payload.subarray(1)));
+            } catch {
+                this.onReplay("other", "[history entry could not be decrypted]");
+            }
+        }
+    }
+
+    disable() {
+        this.log = null;
+    }
+
+    setKey(key) {
+        this.key = key;
+    }
+
+    attach(queue) {
+        this.queue = queue;
+    }
+
+    sendControl(msg) {
+        this.queue.push(encoder.encode(JSON.stringify(msg)), FLAG_CONTROL);
+    }
+
+    hello() {
+        if (this.log) this.sendControl({ type: "history-hello", logId: this.log.id, length: this.log.length });
+    }
+
+    haveOf(logId) {
+        return (this.log ? this.log.have.get(logId) : this.have.get(logId)) || 0;
+    }
+
+    setHave(logId, count) {
+        if (this.log) this.log.setHave(logId, count);
+        else this.have.set(logId, count);
+    }
+
+    // mine: true when this device wrote the line.
+    record(mine, text) {
+        this.append(mine ? AUTHOR_OWNER : AUTHOR_OTHER, text);
+    }
+
+    // Appends are serialized so seq == index.
+    append(author, text) {
+        const log = this.log;
+        if (!log) return;
+        this.recording = this.recording.then(async () => {
+            const body = encoder.encode(text);
+            const payload = new Uint8Array(1 + body.byteLength);
+            payload[0] = author;
+            payload.set(body, 1);
+            log.append(await sealFrame(this.key, payload, log.length));
+        });
+    }
+
+    handleControl(msg) {
+        if (msg.type === "history-hello") {
+            const have = this.haveOf(msg.logId);
+            if (have < msg.length) {
+                this.pendingLogId = msg.logId;
+                this.sendControl({ type: "history-request", logId: msg.logId, from: have });
+            }
+        } else if (msg.type === "history-request") {
+            if (this.log && msg.logId === this.log.id) this.stream(msg.from);
+        }
+    }
+
+    async stream(from) {
+        const { log, queue } = this;
+        let batch = [];
+        let bytes = 0;
+        for (let i = from; i < log.length; i++) {
+            const frame = log.get(i);
+            if (batch.length && bytes + frame.byteLength + 4 > MAX_FRAME_SIZE - 64) {
+                await queue.ready();
+                if (queue.channel.readyState !== "open") return;
+                queue.push(packBatch(batch), FLAG_HISTORY);
+                batch = [];
+                bytes = 0;
+            }
+            // Copy: the log buffer may be reallocated while we wait for the channel.
+            batch.push(frame.slice());
+            bytes += frame.byteLength + 4;
+        }
+        if (batch.length) queue.push(packBatch(batch), FLAG_HISTORY);
+    }
+
+    async handleBatch(frames) {
+        // Through a relay every participant sees every batch; only the requester applies it.
+        const logId = this.pendingLogId;
+        if (!logId) return;
+        let have = this.haveOf(logId);
+        for (const f of frames) {
+            try {
+                const { seq, payload } = await openFrame(this.key, f);
+                if (seq < have) continue;
+                have = seq + 1;
+                // The sender's own lines are from "peer"; lines it received came from someone else.
+                const theirs = payload[0] === AUTHOR_OWNER;
+                const text = decoder.decode(payload.subarray(1));
+                this.append(theirs ? AUTHOR_OTHER : AUTHOR_THIRD, text);
+                this.onReplay(theirs ? "peer" : "other", text);
+            } catch {
+                this.onReplay("other", "[history entry could not be decrypted]");
+            }
+        }
+        await this.recording;
+        this.setHave(logId, have);
+    }
+}
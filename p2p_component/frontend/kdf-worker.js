@@ -0,0 +1,19 @@
+// Web Worker: runs PBKDF2 off the UI thread and posts back a non-extractable CryptoKey.
+
+self.onmessage = async e => {
+    const { id, password, salt, iterations } = e.data;
+    try {
+        const enc = new TextEncoder();
+        const baseKey = await crypto.subtle.importKey("raw", enc.encode(password), "PBKDF2", false, ["deriveKey"]);
+        const key = await crypto.subtle.deriveKey(
+            { name: "PBKDF2", salt: enc.encode(salt), iterations, hash: "SHA-256" },
+            baseKey,
+            { name: "AES-GCM", length: 256 },
+            false,
+            ["encrypt", "decrypt"]
+        );
+        self.postMessage({ id, key });
+    } catch (err) {
+        self.postMessage({ id, error: String(err) });
+    }
+};
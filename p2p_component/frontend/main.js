@@ -0,0 +1,150 @@
+// Entry point: wires Streamlit props and the DOM to the chat session.
+
+import * as streamlit from "./streamlit.js";
+import * as chat from "./chat.js";
+import { ChatLog } from "./chatlog.js";
+
+const AVATARS = {
+    you: "https://avatars.githubusercontent.com/u/2?v=4",
+    peer: "https://avatars.githubusercontent.com/u/9919?s=40",
+};
+
+const chatEl = document.getElementById("chat");
+const statusEl = document.getElementById("status");
+const input = document.getElementById("message");
+const typingEl = document.getElementById("typing");
+// Typing notices go out at most this often and are shown for TYPING_SHOW_MS.
+const TYPING_EVERY_MS = 2000;
+const TYPING_SHOW_MS = 3000;
+let lastTyping = 0;
+let typingTimer = null;
+let themed = false;
+let lastHeight = null;
+let telemetryTimer = null;
+let telemetryMs = null;
+
+function renderMessage({ who, text, file }) {
+    const bubble = document.createElement("div");
+    bubble.className = "bubble " + who;
+    if (themed) {
+        const img = document.createElement("img");
+        img.src = AVATARS[who] ?? AVATARS.peer;
+        bubble.appendChild(img);
+    }
+    const msg = document.createElement("div");
+    msg.className = "msg";
+    const label = document.createElement("b");
+    label.textContent = who === "you" ? "You:" : who === "other" ? "Other:" : "Peer:";
+    msg.append(label, " " + text);
+    if (file) {
+        const link = document.createElement("a");
+        link.href = file.url;
+        link.download = file.name;
+        link.textContent = file.name;
+        msg.appendChild(link);
+    }
+    bubble.appendChild(msg);
+    return bubble;
+}
+
+const chatLog = new ChatLog(chatEl, renderMessage);
+// Read by headless benchmarks (benchmarks/ttfm.py, benchmarks/unordered_latency.py).
+window.p2pMetrics = chat.metrics;
+window.p2pRecover = chat.recover;
+window.p2pEvents = chat.events;
+
+chat.events.onMessage = (who, text) => {
+    if (who !== "you") typingEl.hidden = true;
+    chatLog.append({ who, text });
+};
+chat.history.onReplay = (who, text) => chatLog.append({ who, text });
+chat.events.onStatus = text => (statusEl.textContent = text);
+chat.events.onTyping = () => {
+    typingEl.hidden = false;
+    clearTimeout(typingTimer);
+    typingTimer = setTimeout(() => (typingEl.hidden = true), TYPING_SHOW_MS);
+};
+chat.outbox.onResent = count => {
+    if (count) statusEl.textContent += ` Resent ${count} unacknowledged frame(s).`;
+};
+chat.outbox.onDropped = () => {
+    statusEl.textContent = `${chat.outbox.dropped} sent message(s) were never acknowledged and will not be resent if the connection drops.`;
+};
+chat.files.onProgress = (direction, name, done, total) => {
+    const verb = direction === "send" ? "Sending" : "Receiving";
+    statusEl.textContent = done === total ? `${name}: done.` : `${verb} ${name}: ${Math.floor((100 * done) / total)}%`;
+};
+chat.files.onFile = (name, blob) => {
+    chatLog.append({ who: "peer", text: "sent a file: ", file: { name, url: URL.createObjectURL(blob) } });
+};
+
+streamlit.onRender(args => {
+    document.getElementById("room-label").textContent = args.room;
+    document.getElementById("password-label").textContent = args.password;
+    document.getElementById("password-row").hidden = !args.show_password;
+    document.getElementById("theme-toggle").hidden = !args.theme_toggle;
+    if (args.theme_toggle !== themed) {
+        themed = args.theme_toggle;
+        document.body.className = themed ? "dark" : "plain";
+        chatLog.refresh();
+    }
+    if (args.scrollback !== chatLog.scrollback) chatLog.setScrollback(args.scrollback);
+    const options = {
+        keepHistory: args.keep_history, relay: args.relay, iceServers: args.ice_servers, compress: args.compress,
+        unordered: args.unordered, legacyPeers: args.legacy_peers,
+    };
+    if (chat.configure(args.room, args.password, args.signaling_url, options)) {
+        statusEl.textContent = "Room or password changed. Press Host or Join to reconnect.";
+    }
+    const interval = args.telemetry_interval ? args.telemetry_interval * 1000 : null;
+    if (interval !== telemetryMs) {
+        telemetryMs = interval;
+        clearInterval(telemetryTimer);
+        if (interval) telemetryTimer = setInterval(reportTelemetry, interval);
+    }
+    if (args.height !== lastHeight) {
+        lastHeight = args.height;
+        streamlit.setFrameHeight(args.height);
+    }
+});
+
+// Every value sent reruns the script, so telemetry goes out at the prop's
+// interval (seconds, off by default) and only while connected.
+async function reportTelemetry() {
+    const stats = await chat.snapshot();
+    if (stats) streamlit.setComponentValue({ ...stats, sampledAt: Date.now() / 1000 });
+}
+
+async function send() {
+    const text = input.value.trim();
+    if (!text) return;
+    if (await chat.send(text)) input.value = "";
+}
+
+function sendFile() {
+    const fileInput = document.getElementById("file");
+    const file = fileInput.files[0];
+    if (!file) return;
+    if (chat.sendFile(file)) {
+        chatLog.append({ who: "you", text: `sending file ${file.name}` });
+        fileInput.value = "";
+    }
+}
+
+document.getElementById("host-btn").onclick = () => chat.start(true);
+document.getElementById("join-btn").onclick = () => chat.start(false);
+document.getElementById("send-btn").onclick = send;
+document.getElementById("file-btn").onclick = sendFile;
+input.addEventListener("keydown", e => {
+    if (e.key === "Enter") send();
+});
+input.addEventListener("input", () => {
+    if (performance.now() - lastTyping < TYPING_EVERY_MS) return;
+    lastTyping = performance.now();
+    chat.typing();
+});
+document.getElementById("theme-toggle").onclick = () => {
+    document.body.className = document.body.className === "dark" ? "light" : "dark";
+};
+
+streamlit.ready();
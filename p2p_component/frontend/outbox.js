@@ -0,0 +1,142 @@
+// Delivery tracking for chat frames, so a connection can recover without losing messages.
+//
+// Every data frame (chat lines and batches; control, file and history frames
+// have their own resume logic) is kept, sealed, until the peer acknowledges
+// its seq. The receiver drops data frames at or below the last seq it
+// delivered, so a resent frame is never shown twice. After an ICE restart the
+// recovering side holds the send queue and sends outbox-resume with the last
+// seq it has; the peer resends everything after that (the same bytes under
+// the same session key) and answers with its own resume point. New messages
+// go out only after that exchange, so nothing overtakes a resent frame.
+// Past OUTBOX_LIMIT the oldest entry is evicted and reported through
+// onDropped: it may well have arrived, but it can no longer be resent.
+//
+// Control messages (FLAG_CONTROL, JSON):
+//   outbox-ack    {seq}           every ACK_EVERY data frames or after ACK_DELAY_MS
+//   outbox-resume {have, reply}   after a recovery; the peer answers with reply: true
+
+import { parseFrame, unpackBatch, FLAG_BATCH, FLAG_CONTROL, FLAG_CHUNK, FLAG_HISTORY, FLAG_HANDSHAKE } from "./frame.js";
+
+export const ACK_EVERY = 32;
+export const ACK_DELAY_MS = 200;
+export const OUTBOX_LIMIT = 1024;
+// Pages without an outbox never answer a resume; stop holding the queue after this.
+const RESUME_TIMEOUT_MS = 3000;
+const encoder = new TextEncoder();
+
+export function isDataFrame(flags) {
+    return !(flags & (FLAG_CONTROL | FLAG_CHUNK | FLAG_HISTORY | FLAG_HANDSHAKE));
+}
+
+export class Outbox {
+    constructor() {
+        this.entries = [];  // {seq, frame, payload, flags}, oldest first
+        this.received = -1;  // last data seq delivered from the peer
+        this.unacked = 0;
+        this.ackTimer = null;
+        this.resumeTimer = null;
+        this.queue = null;
+        this.dropped = 0;  // chat lines evicted before the peer acknowledged them
+        this.onResent = count => {};
+        this.onDropped = lines => {};
+    }
+
+    attach(queue) {
+        this.queue = queue;
+    }
+
+    // A new connection: the peer starts from nothing. Unacked entries stay for requeue().
+    reset() {
+        clearTimeout(this.ackTimer);
+        clearTimeout(this.resumeTimer);
+        this.ackTimer = this.resumeTimer = null;
+        this.received = -1;
+        this.unacked = 0;
+    }
+
+    clear() {
+        this.reset();
+        this.entries = [];
+        this.dropped = 0;
+    }
+
+    sendControl(msg, now = false) {
+        const payload = encoder.encode(JSON.stringify(msg));
+        if (now) this.queue.sendNow(payload, FLAG_CONTROL);
+        else this.queue.push(payload, FLAG_CONTROL);
+    }
+
+    // Sender side, for every sealed frame. `payload`/`flags` are kept as pushed, before compression.
+    sent(seq, frame, payload, flags) {
+        if (!isDataFrame(flags)) return;
+        this.entries.push({ seq, frame, payload, flags });
+        if (this.entries.length > OUTBOX_LIMIT) {
+            const evicted = this.entries.shift();
+            const lines = evicted.flags & FLAG_BATCH ? unpackBatch(evicted.payload).length : 1;
+            this.dropped += lines;
+            this.onDropped(lines);
+        }
+    }
+
+    // Receiver side, before decrypting: false for a resent frame that was already delivered.
+    fresh(bytes) {
+        const { flags, seq } = parseFrame(bytes);
+        return !isDataFrame(flags) || seq > this.received;
+    }
+
+    // Receiver side, after a data frame was decrypted.
+    delivered(seq) {
+        this.received = Math.max(this.received, seq);
+        if (++this.unacked >= ACK_EVERY) this.sendAck();
+        else if (this.ackTimer === null) this.ackTimer = setTimeout(() => this.sendAck(), ACK_DELAY_MS);
+    }
+
+    sendAck() {
+        clearTimeout(this.ackTimer);
+        this.ackTimer = null;
+        this.unacked = 0;
+        if (this.queue && this.queue.channel.readyState === "open") {
+            this.sendControl({ type: "outbox-ack", seq: this.received });
+        }
+    }
+
+    // Connection interrupted: nothing new goes out until resume() and the peer's answer.
+    hold() {
+        this.queue?.pause();
+    }
+
+    resume() {
+        if (!this.queue) return;
+        this.sendControl({ type: "outbox-resume", have: this.received }, true);
+        clearTimeout(this.resumeTimer);
+        this.resumeTimer = setTimeout(() => this.release(), RESUME_TIMEOUT_MS);
+    }
+
+    release() {
+        clearTimeout(this.resumeTimer);
+        this.resumeTimer = null;
+        this.queue?.resume();
+    }
+
+    // After a full reconnect the old frames are sealed with a dead session: send their payloads again.
+    requeue() {
+        const entries = this.entries;
+        this.entries = [];
+        for (const { payload, flags } of entries) this.queue.push(payload, flags);
+        return entries.length;
+    }
+
+    handleControl(msg) {
+        if (msg.type === "outbox-ack") {
+            let drop = 0;
+            while (drop < this.entries.length && this.entries[drop].seq <= msg.seq) drop++;
+            this.entries.splice(0, drop);
+        } else if (msg.type === "outbox-resume") {
+            const resend = this.entries.filter(e => e.seq > msg.have);
+            for (const { frame } of resend) this.queue.channel.send(frame);
+            if (!msg.reply) this.sendControl({ type: "outbox-resume", have: this.received, reply: true }, true);
+            this.release();
+            this.onResent(resend.length);
+        }
+    }
+}
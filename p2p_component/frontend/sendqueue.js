@@ -0,0 +1,142 @@
+// Outbound queue for the data channel.
+//
+// Messages pushed within `windowMs` of each other are coalesced into one
+// encrypted frame (FLAG_BATCH, see frame.js), up to `maxBatchBytes`. Before
+// each send the queue checks `bufferedAmount` and, above `highWater`, waits for
+// `bufferedamountlow` instead of piling more data onto the SCTP buffer.
+// Frames with their own flags (control, file chunks) are never batched.
+// pause() holds everything pushed until resume(), e.g. while a connection recovers.
+
+import { FLAG_BATCH, packBatch } from "./frame.js";
+
+export class SendQueue {
+    constructor(channel, seal, { windowMs = 4, maxBatchBytes = 16 * 1024, highWater = 1024 * 1024, lowWater = 256 * 1024 } = {}) {
+        this.channel = channel;
+        this.seal = seal;
+        this.windowMs = windowMs;
+        this.maxBatchBytes = maxBatchBytes;
+        this.highWater = highWater;
+        this.pending = [];
+        this.pendingBytes = 0;
+        this.timer = null;
+        this.pumping = false;
+        this.paused = false;
+        this.waiters = [];
+        this.stats = { messages: 0, frames: 0, bytes: 0, stalls: 0 };
+        channel.bufferedAmountLowThreshold = lowWater;
+        channel.addEventListener("close", () => this.wake());
+    }
+
+    push(payload, flags = 0) {
+        this.pending.push({ payload, flags });
+        this.pendingBytes += payload.byteLength;
+        if (this.pumping || this.paused) return;
+        if (this.pendingBytes >= this.maxBatchBytes) {
+            this.run();
+        } else if (this.timer === null) {
+            this.timer = setTimeout(() => this.run(), this.windowMs);
+        }
+    }
+
+    pause() {
+        this.paused = true;
+    }
+
+    resume() {
+        this.paused = false;
+        if (this.pending.length) this.run();
+    }
+
+    // Seal and send right away, ahead of anything pending (recovery control messages).
+    async sendNow(payload, flags) {
+        const frame = await this.seal(payload, flags);
+        if (this.channel.readyState === "open") this.channel.send(frame);
+    }
+
+    // For producers like file uploads: resolves when there is room for more data.
+    async ready() {
+        while (this.channel.readyState === "open" &&
+               (this.pendingBytes >= this.maxBatchBytes || this.channel.bufferedAmount > this.highWater)) {
+            await new Promise(resolve => this.waiters.push(resolve));
+        }
+    }
+
+    wake() {
+        const waiters = this.waiters;
+        this.waiters = [];
+        for (const resolve of waiters) resolve();
+    }
+
+    // Resolves once the channel's buffer has drained below lowWater.
+    drained() {
+        if (this.channel.bufferedAmount <= this.highWater) return Promise.resolve();
+        this.stats.stalls++;
+        return new Promise(resolve => {
+            this.channel.addEventListener("bufferedamountlow", resolve, { once: true });
+            this.channel.addEventListener("close", resolve, { once: true });
+        }).then(() => this.wake());
+    }
+
+    takeBatch() {
+        let count = 1;
+        if (this.pending[0].flags === 0) {
+            let bytes = this.pending[0].payload.byteLength + 4;
+            while (count < this.pending.length && this.pending[count].flags === 0) {
+                const size = this.pending[count].payload.byteLength + 4;
+                if (bytes + size > this.maxBatchBytes) break;
+                bytes += size;
+                count++;
+            }
+        }
+        const batch = this.pending.splice(0, count);
+        for (const { payload } of batch) this.pendingBytes -= payload.byteLength;
+        return batch;
+    }
+
+    // A batch that could not go out goes back to the front, in order. Sealed
+    // data frames are also in the outbox (chat.js), which resends them after a reconnect.
+    putBack(batch) {
+        this.pending.unshift(...batch);
+        for (const { payload } of batch) this.pendingBytes += payload.byteLength;
+    }
+
+    // Starts pump() from a callback: a failed seal is logged, not left unhandled.
+    run() {
+        this.pump().catch(err => console.error("Send failed:", err));
+    }
+
+    async pump() {
+        clearTimeout(this.timer);
+        this.timer = null;
+        if (this.pumping) return;
+        this.pumping = true;
+        try {
+            while (this.pending.length && !this.paused && this.channel.readyState === "open") {
+                await this.drained();
+                const batch = this.takeBatch();
+                let frame;
+                try {
+                    frame = batch.length === 1
+                        ? await this.seal(batch[0].payload, batch[0].flags)
+                        : await this.seal(packBatch(batch.map(m => m.payload)), FLAG_BATCH);
+                } catch (err) {
+                    this.putBack(batch);
+                    throw err;
+                }
+                // The channel may have closed while the frame was being sealed.
+                if (this.channel.readyState !== "open") {
+                    this.putBack(batch);
+                    break;
+                }
+                this.channel.send(frame);
+                this.stats.messages += batch.length;
+                this.stats.frames++;
+                this.stats.bytes += frame.byteLength;
+                this.wake();
+            }
+        } finally {
+            this.pumping = false;
+            this.wake();
+        }
+    }
+}
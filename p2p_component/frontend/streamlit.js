@@ -0,0 +1,23 @@
+// Minimal Streamlit component bridge (no npm / build step needed).
+
+function post(type, data) {
+    window.parent.postMessage({ isStreamlitMessage: true, type, ...data }, "*");
+}
+
+export function ready() {
+    post("streamlit:componentReady", { apiVersion: 1 });
+}
+
+export function setFrameHeight(height) {
+    post("streamlit:setFrameHeight", { height });
+}
+
+export function setComponentValue(value) {
+    post("streamlit:setComponentValue", { value, dataType: "json" });
+}
+
+export function onRender(callback) {
+    window.addEventListener("message", e => {
+        if (e.data && e.data.type === "streamlit:render") callback(e.data.args);
+    });
+}
@@ -0,0 +1,37 @@
+// Connection telemetry: condenses an RTCStatsReport into the flat record that
+// main.js returns to the Streamlit script (p2p_component/telemetry.py).
+
+// Stats of the candidate pair in use: transport.selectedCandidatePairId where
+// the browser reports it, else the nominated pair that succeeded.
+function selectedPair(report) {
+    let pair = null;
+    for (const stat of report.values()) {
+        if (stat.type === "transport" && stat.selectedCandidatePairId) return report.get(stat.selectedCandidatePairId);
+        if (stat.type === "candidate-pair" && stat.nominated && stat.state === "succeeded") pair = stat;
+    }
+    return pair;
+}
+
+export function summarizeStats(report) {
+    const summary = {
+        rttMs: null, availableOutgoingKbps: null, localCandidateType: null, remoteCandidateType: null,
+        bytesSent: 0, bytesReceived: 0, messagesSent: 0, messagesReceived: 0,
+    };
+    for (const stat of report.values()) {
+        if (stat.type !== "data-channel") continue;
+        summary.bytesSent += stat.bytesSent ?? 0;
+        summary.bytesReceived += stat.bytesReceived ?? 0;
+        summary.messagesSent += stat.messagesSent ?? 0;
+        summary.messagesReceived += stat.messagesReceived ?? 0;
+    }
+    const pair = selectedPair(report);
+    if (pair) {
+        if (pair.currentRoundTripTime != null) summary.rttMs = pair.currentRoundTripTime * 1000;
+        if (pair.availableOutgoingBitrate != null) summary.availableOutgoingKbps = pair.availableOutgoingBitrate / 1000;
+        summary.localCandidateType = report.get(pair.localCandidateId)?.candidateType ?? null;
+        summary.remoteCandidateType = report.get(pair.remoteCandidateId)?.candidateType ?? null;
+    }
+    // A TURN candidate on either end means the traffic goes through a relay server.
+    summary.turnRelayed = summary.localCandidateType === "relay" || summary.remoteCandidateType === "relay";
+    return summary;
+}
@@ -0,0 +1,211 @@
+// Low-latency chat lane: a second data channel with ordered: false and
+// limited maxRetransmits, so one lost packet no longer stalls every later
+// message behind SCTP's retransmission timer (at least a second in browsers).
+//
+// Reliability moves up here. Chat lines get a message id; the receiver acks
+// the next id it expects plus the ids it already holds beyond that (selective
+// ack), and the sender retransmits only what is missing: right away when a
+// later id was acked more than one RTT after the gap was sent, otherwise when
+// the RTO (RFC 6298 estimate from ack round trips) expires. The reorder buffer
+// releases lines for display in id order. Ephemeral messages (typing) are
+// never acked, buffered or resent.
+//
+// Payload, sealed like any other frame (frame.js) before it goes on the channel:
+//   0  1  kind (KIND_*)
+//   1  4  id (uint32): message id, or for an ack the next id expected
+//   5  n  body: message bytes, ephemeral JSON, or for an ack uint32 ids held beyond `id`
+
+export const UNORDERED_LABEL = "chat-unordered";
+export const MAX_RETRANSMITS = 1;
+
+const KIND_MESSAGE = 0;
+const KIND_EPHEMERAL = 1;
+const KIND_ACK = 2;
+const HEADER = 5;
+const MAX_SACK = 64;
+const MIN_RTO_MS = 40;
+const MAX_RTO_MS = 2000;
+const INITIAL_RTO_MS = 250;
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+function packet(kind, id, body = new Uint8Array(0)) {
+    const out = new Uint8Array(HEADER + body.byteLength);
+    out[0] = kind;
+    new DataView(out.buffer).setUint32(1, id);
+    out.set(body, HEADER);
+    return out;
+}
+
+export class UnorderedLink {
+    constructor() {
+        this.channel = null;
+        this.onMessage = bytes => {};
+        this.onEphemeral = msg => {};
+        // kind is "decrypt" (the frame did not open) or "malformed" (it opened but did not parse).
+        this.onError = (kind, err) => {};
+        this.detach();
+    }
+
+    // `seal(payload)` and `open(frame)` encrypt and decrypt with the session (chat.js).
+    attach(channel, seal, open) {
+        this.detach();
+        this.channel = channel;
+        this.seal = seal;
+        this.open = open;
+        channel.binaryType = "arraybuffer";
+        channel.onmessage = e => this.receive(new Uint8Array(e.data));
+        channel.onclose = () => this.channel === channel && this.detach();
+    }
+
+    detach() {
+        clearTimeout(this.timer);
+        clearTimeout(this.ackTimer);
+        this.channel = null;
+        this.timer = this.ackTimer = null;
+        this.nextId = 0;
+        this.inflight = new Map();  // id -> {frame, sentAt, retries}
+        this.expected = 0;  // next id to display
+        this.held = new Map();  // id -> bytes, received ahead of `expected`
+        this.srtt = null;
+        this.rttvar = 0;
+        this.rto = INITIAL_RTO_MS;
+        this.stats = { sent: 0, retransmits: 0, duplicates: 0, reordered: 0, decryptFailures: 0, malformed: 0 };
+    }
+
+    get ready() {
+        return this.channel?.readyState === "open";
+    }
+
+    async send(bytes) {
+        const id = this.nextId++;
+        const frame = await this.seal(packet(KIND_MESSAGE, id, bytes));
+        this.inflight.set(id, { frame, sentAt: performance.now(), retries: 0 });
+        this.transmit(frame);
+        this.stats.sent++;
+        this.schedule();
+    }
+
+    // Fire-and-forget; false when the lane is not open.
+    async sendEphemeral(msg) {
+        if (!this.ready) return false;
+        this.transmit(await this.seal(packet(KIND_EPHEMERAL, 0, encoder.encode(JSON.stringify(msg)))));
+        return true;
+    }
+
+    transmit(frame) {
+        if (this.ready) this.channel.send(frame);
+    }
+
+    retransmit(id, entry, now) {
+        entry.sentAt = now;
+        entry.retries++;
+        this.stats.retransmits++;
+        this.transmit(entry.frame);
+    }
+
+    // One timer for the oldest unacked message.
+    schedule() {
+        if (this.timer !== null || !this.inflight.size) return;
+        const oldest = Math.min(...Array.from(this.inflight.values(), e => e.sentAt));
+        this.timer = setTimeout(() => this.expire(), Math.max(0, oldest + this.rto - performance.now()));
+    }
+
+    expire() {
+        this.timer = null;
+        const now = performance.now();
+        let expired = false;
+        for (const [id, entry] of this.inflight) {
+            if (now - entry.sentAt >= this.rto) {
+                this.retransmit(id, entry, now);
+                expired = true;
+            }
+        }
+        // Back off while the path is down so an outage is not flooded with resends.
+        if (expired) this.rto = Math.min(2 * this.rto, MAX_RTO_MS);
+        this.schedule();
+    }
+
+    sample(rtt) {
+        if (this.srtt === null) {
+            this.srtt = rtt;
+            this.rttvar = rtt / 2;
+        } else {
+            this.rttvar = 0.75 * this.rttvar + 0.25 * Math.abs(this.srtt - rtt);
+            this.srtt = 0.875 * this.srtt + 0.125 * rtt;
+        }
+        this.rto = Math.min(MAX_RTO_MS, Math.max(MIN_RTO_MS, this.srtt + 4 * this.rttvar));
+    }
+
+    handleAck(next, held) {
+        const now = performance.now();
+        const acked = id => id < next || held.includes(id);
+        for (const [id, entry] of this.inflight) {
+            if (!acked(id)) continue;
+            if (entry.retries === 0) this.sample(now - entry.sentAt);  // Karn: no samples from resends
+            this.inflight.delete(id);
+        }
+        // A later id got through: the gaps below it were lost unless they are still in flight.
+        const highest = Math.max(next - 1, ...held);
+        const rtt = this.srtt ?? this.rto;
+        for (const [id, entry] of this.inflight) {
+            if (id < highest && now - entry.sentAt > rtt) this.retransmit(id, entry, now);
+        }
+        if (!this.inflight.size) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+    }
+
+    async receive(data) {
+        let payload;
+        try {
+            payload = await this.open(data);
+        } catch (err) {
+            this.stats.decryptFailures++;
+            return this.onError("decrypt", err);
+        }
+        try {
+            this.handle(payload);
+        } catch (err) {
+            this.stats.malformed++;
+            this.onError("malformed", err);
+        }
+    }
+
+    handle(payload) {
+        const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+        const kind = payload[0];
+        const id = view.getUint32(1);
+        const body = payload.subarray(HEADER);
+        if (kind === KIND_ACK) {
+            const held = [];
+            for (let offset = 0; offset + 4 <= body.byteLength; offset += 4) held.push(view.getUint32(HEADER + offset));
+            return this.handleAck(id, held);
+        }
+        if (kind === KIND_EPHEMERAL) return this.onEphemeral(JSON.parse(decoder.decode(body)));
+        if (id < this.expected || this.held.has(id)) {
+            this.stats.duplicates++;  // our ack was lost; ack again
+        } else if (id > this.expected) {
+            this.held.set(id, body);
+            this.stats.reordered++;
+        } else {
+            this.onMessage(body);
+            this.expected++;
+            while (this.held.has(this.expected)) {
+                this.onMessage(this.held.get(this.expected));
+                this.held.delete(this.expected++);
+            }
+        }
+        // Acks for one burst of arrivals go out together.
+        if (this.ackTimer === null) this.ackTimer = setTimeout(() => this.sendAck(), 0);
+    }
+
+    async sendAck() {
+        this.ackTimer = null;
+        const ids = Array.from(this.held.keys()).slice(0, MAX_SACK);
+        const body = new Uint8Array(4 * ids.length);
+        ids.forEach((id, i) => new DataView(body.buffer).setUint32(4 * i, id));
+        this.transmit(await this.seal(packet(KIND_ACK, this.expected, body)));
+    }
+}
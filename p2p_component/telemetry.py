@@ -0,0 +1,161 @@
+# p2p_component/telemetry.py: connection metrics returned by the chat component.
+#
+# With telemetry_interval=N the frontend samples RTCPeerConnection.getStats()
+# every N seconds and returns a flat dict as the value of p2p_chat() (see
+# frontend/telemetry.js). show_telemetry() puts it in a sidebar panel and keeps
+# the latest sample of every session in this process, which is exported in the
+# Prometheus text format:
+#   P2P_METRICS_FILE=/var/lib/node_exporter/p2p.prom  textfile, rewritten on each sample
+#   P2P_METRICS_PORT=9464                              http://host:9464/metrics
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Samples older than this are dropped from the export (closed tabs never say goodbye).
+# Streamlit returns the last component value on every rerun, long after the
+# connection that sent it is gone, so a sample is aged from when this process
+# first saw its `sampledAt`. That is only compared with the previous one: it is
+# the browser's clock, which need not agree with ours.
+STALE_AFTER = 120
+
+# (key in the sample, metric name, type, help)
+METRICS = (
+    ("rttMs", "p2p_chat_rtt_milliseconds", "gauge", "Round-trip time of the selected candidate pair."),
+    ("availableOutgoingKbps", "p2p_chat_available_outgoing_kbps", "gauge", "Estimated available send bitrate."),
+    ("bytesSent", "p2p_chat_sent_bytes_total", "counter", "Bytes sent on the data channels."),
+    ("bytesReceived", "p2p_chat_received_bytes_total", "counter", "Bytes received on the data channels."),
+    ("messagesSent", "p2p_chat_sent_messages_total", "counter", "Data channel messages sent."),
+    ("messagesReceived", "p2p_chat_received_messages_total", "counter", "Data channel messages received."),
+    ("bufferedAmount", "p2p_chat_buffered_bytes", "gauge", "Bytes queued in the data channel send buffer."),
+    ("unacked", "p2p_chat_unacked_messages", "gauge", "Sent chat frames the peer has not acknowledged."),
+    ("retransmits", "p2p_chat_retransmits_total", "counter", "Chat lines resent on the unordered channel."),
+    ("decryptFailures", "p2p_chat_decrypt_failures_total", "counter", "Frames that failed to decrypt."),
+    ("recoveries", "p2p_chat_recoveries_total", "counter", "Connections recovered after an ICE restart."),
+)
+LABELS = ("room", "mode", "connectionState", "localCandidateType", "remoteCandidateType")
+
+_samples = {}  # session id -> sample
+_lock = threading.Lock()
+_server = None
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "local"
+    except ImportError:
+        return "local"
+
+
+def record(stats, session=None):
+    """Keep a new sample; returns False for a repeat of the last one, which keeps its age."""
+    session = session or _session_id()
+    with _lock:
+        previous = _samples.get(session)
+        if previous is not None and previous["sampledAt"] == stats["sampledAt"]:
+            return False
+        _samples[session] = {**stats, "receivedAt": time.time()}
+        return True
+
+
+def current():
+    now = time.time()
+    with _lock:
+        for session in [s for s, stats in _samples.items() if now - stats["receivedAt"] > STALE_AFTER]:
+            del _samples[session]
+        return dict(_samples)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(samples):
+    lines = [
+        "# HELP p2p_chat_turn_relayed 1 when the selected candidate pair goes through a TURN server.",
+        "# TYPE p2p_chat_turn_relayed gauge",
+    ]
+    labels = {}
+    for session, stats in samples.items():
+        pairs = [("session", session)] + [(label, stats.get(label) or "") for label in LABELS]
+        labels[session] = "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+        lines.append(f"p2p_chat_turn_relayed{labels[session]} {int(bool(stats.get('turnRelayed')))}")
+    for key, name, kind, help_text in METRICS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{labels[s]} {stats[key]}" for s, stats in samples.items() if stats.get(key) is not None]
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, samples):
+    # Written next to the target and renamed, so a scrape never sees half a file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(to_prometheus(samples))
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = to_prometheus(current()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    # One exporter per process; Streamlit reruns call this again and get the same server.
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def _fmt(value, unit=""):
+    return "–" if value is None else f"{value:,.0f}{unit}"
+
+
+def show_telemetry(stats):
+    """Sidebar panel for the value returned by p2p_chat; also records and exports it."""
+    import streamlit as st
+
+    st.sidebar.subheader("Connection")
+    if not stats:
+        st.sidebar.caption("No telemetry yet: connect with Host or Join.")
+        return
+    # Kept per session, so a repeat is still known after current() drops the sample.
+    seen = st.session_state.setdefault("p2p_telemetry_seen", {})
+    if seen.get("sampledAt") != stats["sampledAt"]:
+        seen.update(sampledAt=stats["sampledAt"], receivedAt=time.time())
+        record(stats)
+    if os.environ.get("P2P_METRICS_PORT"):
+        serve(int(os.environ["P2P_METRICS_PORT"]))
+    if os.environ.get("P2P_METRICS_FILE"):
+        write_textfile(os.environ["P2P_METRICS_FILE"], current())
+    age = time.time() - seen["receivedAt"]
+    if age > STALE_AFTER:
+        st.sidebar.caption(f"No telemetry for {age:,.0f} s: the connection is closed.")
+        return
+
+    path = f"{stats.get('localCandidateType') or '?'} → {stats.get('remoteCandidateType') or '?'}"
+    st.sidebar.caption(f"{stats.get('connectionState')}, {stats.get('mode')}, candidates {path}"
+                       + (" (TURN relayed)" if stats.get("turnRelayed") else ""))
+    left, right = st.sidebar.columns(2)
+    left.metric("RTT", _fmt(stats.get("rttMs"), " ms"))
+    right.metric("Send buffer", _fmt(stats.get("bufferedAmount"), " B"))
+    left.metric("Sent", _fmt(stats.get("bytesSent"), " B"))
+    right.metric("Received", _fmt(stats.get("bytesReceived"), " B"))
+    left.metric("Unacked", _fmt(stats.get("unacked")))
+    right.metric("Decrypt failures", _fmt(stats.get("decryptFailures")))
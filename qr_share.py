@@ -0,0 +1,67 @@
+# qr_share.py
+# QR codes for the "share password" panel, rendered as compact inline SVG.
+#
+# Results are kept in a small LRU cache so a Streamlit rerun with the same
+# password costs one dict lookup. The cache is keyed on a SHA-256 of the
+# payload, so the secret itself is never stored as a key.
+
+import hashlib
+from collections import OrderedDict
+
+import qrcode
+
+import rerun_profile
+
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+
+
+def _build_svg(payload, size, border):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=border)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    n = len(matrix)
+    # One path, one run-length segment per horizontal run of dark modules.
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(parts)}"/></svg>'
+    )
+
+
+def qr_svg(payload, size=160, border=2):
+    with rerun_profile.phase("qr"):
+        svg = _cached_svg(payload, size, border)
+    rerun_profile.size("qr svg", len(svg))
+    return svg
+
+
+def _cached_svg(payload, size, border):
+    digest = hashlib.sha256(f"{size}:{border}:{payload}".encode()).digest()
+    svg = _cache.get(digest)
+    if svg is not None:
+        _cache.move_to_end(digest)
+        return svg
+    svg = _build_svg(payload, size, border)
+    _cache[digest] = svg
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return svg
+
+
+def clear_cache():
+    _cache.clear()
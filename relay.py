@@ -0,0 +1,131 @@
+# relay.py
+# Fan-out relay for rooms with more than two people.
+# Run with: python relay.py <room>  (needs aiortc; the signaling server must be running)
+#
+# Without it every page holds one RTCPeerConnection, so a room is two people,
+# and a full mesh would make each sender upload every message N-1 times. The
+# relay joins the room as a WebRTC peer, answers every browser that connects
+# with `relay=True`, and forwards each data-channel frame to all the other
+# participants. It never has the room key: frames are AES-GCM sealed by the
+# browsers and passed through as opaque bytes, so each sender uploads once.
+
+import asyncio
+import json
+import os
+import sys
+from urllib.parse import quote
+
+SIGNALING_URL = os.environ.get("SIGNALING_URL", "ws://localhost:8765")
+RELAY_ID = "relay"
+ICE_SERVERS = ["stun:stun.l.google.com:19302"]
+
+# A participant whose channel has this much unsent data is dropped instead of
+# holding frames for everybody else (same policy as lan_server.MAX_OUTBUF).
+MAX_BUFFERED = 4 * 1024 * 1024
+
+
+class RelayHub:
+    """Peer id -> channel. Transport-agnostic so the benchmark can drive it too."""
+
+    def __init__(self, max_buffered=MAX_BUFFERED):
+        self.channels = {}
+        self.max_buffered = max_buffered
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, peer, channel):
+        self.channels[peer] = channel
+
+    def remove(self, peer):
+        return self.channels.pop(peer, None)
+
+    def forward(self, sender, data):
+        self.frames += 1
+        self.bytes_in += len(data)
+        for peer, channel in list(self.channels.items()):
+            if peer == sender:
+                continue
+            if channel.bufferedAmount > self.max_buffered:
+                self.remove(peer)
+                channel.close()
+                continue
+            channel.send(data)
+            self.bytes_out += len(data)
+
+
+def _candidate(data):
+    from aiortc.sdp import candidate_from_sdp
+
+    candidate = candidate_from_sdp(data["candidate"].split(":", 1)[1])
+    candidate.sdpMid = data.get("sdpMid")
+    candidate.sdpMLineIndex = data.get("sdpMLineIndex")
+    return candidate
+
+
+async def run(room, signaling_url=SIGNALING_URL):
+    from aiortc import RTCConfiguration, RTCIceServer, RTCPeerConnection, RTCSessionDescription
+    from websockets.asyncio.client import connect
+
+    hub = RelayHub()
+    pcs = {}
+    config = RTCConfiguration(iceServers=[RTCIceServer(urls=url) for url in ICE_SERVERS])
+
+    async def close(peer):
+        hub.remove(peer)
+        pc = pcs.pop(peer, None)
+        if pc:
+            await pc.close()
+            print(f"{peer} left ({len(pcs)} connected)")
+
+    async def accept(ws, peer, offer):
+        await close(peer)
+        pc = pcs[peer] = RTCPeerConnection(config)
+
+        @pc.on("datachannel")
+        def on_datachannel(channel):
+            hub.add(peer, channel)
+            channel.on("message", lambda message: hub.forward(peer, message))
+            print(f"{peer} joined ({len(pcs)} connected)")
+
+        @pc.on("connectionstatechange")
+        async def on_state():
+            if pc.connectionState in ("failed", "closed") and pcs.get(peer) is pc:
+                await close(peer)
+
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=offer["sdp"], type=offer["type"]))
+        await pc.setLocalDescription(await pc.createAnswer())
+        # aiortc gathers every candidate before setLocalDescription returns,
+        # so the answer SDP already carries them.
+        answer = {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
+        await ws.send(json.dumps({"room": room, "type": "answer", "from": RELAY_ID, "to": peer, "answer": answer}))
+
+    async with connect(f"{signaling_url}/{quote(room)}") as ws:
+        print(f"Relaying room {room!r} via {signaling_url}")
+        try:
+            async for raw in ws:
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(data, dict) or data.get("room") != room:
+                    continue
+                peer = data.get("from")
+                if data.get("type") == "offer" and data.get("relay") and peer:
+                    await accept(ws, peer, data["offer"])
+                elif data.get("type") in ("candidate", "candidates") and data.get("to") == RELAY_ID and peer in pcs:
+                    for candidate in data.get("candidates") or [data.get("candidate") or {}]:
+                        if candidate.get("candidate"):
+                            await pcs[peer].addIceCandidate(_candidate(candidate))
+        finally:
+            for peer in list(pcs):
+                await close(peer)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python relay.py <room>")
+    try:
+        asyncio.run(run(sys.argv[1]))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,164 @@
+# rerun_profile.py
+# Opt-in timing of Streamlit script reruns, phase by phase.
+#
+# Off unless P2P_PROFILE is set (1, or "cprofile" to also run cProfile) or the
+# page is opened with ?profile=1. When off, begin() returns None and phase()
+# only checks a thread-local. When on, every rerun records:
+#   - the duration of each phase (qr, component, ...) and the whole run,
+#     with rolling p50/p95/p99 over the last ROLLING reruns of this process,
+#     shown in a sidebar expander;
+#   - payload sizes reported with size() (QR markup, component props);
+#   - a Chrome trace: one "X" event per phase appended to
+#     $P2P_PROFILE_DIR/rerun-trace-<pid>.json (open in chrome://tracing or Perfetto),
+#     moved to rerun-trace-<pid>.1.json once it reaches TRACE_MAX_BYTES;
+#   - with P2P_PROFILE=cprofile, a pstats dump per rerun next to it, keeping the
+#     last ROLLING (python -m pstats, snakeviz).
+#
+# Apps call begin() after their imports and end() last; library code wraps its
+# hot spots in phase(). Imports are not a phase: modules stay cached between
+# reruns, so only the first one would pay for them.
+
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+ROLLING = 200
+TRACE_MAX_BYTES = 32 * 1024 * 1024
+PROFILE_DIR = os.environ.get("P2P_PROFILE_DIR", ".rerun_profile")
+
+_durations = defaultdict(lambda: deque(maxlen=ROLLING))  # phase -> ms
+_sizes = {}
+_lock = threading.Lock()
+_local = threading.local()  # Streamlit runs each session's script in its own thread
+_runs = 0
+
+
+class RerunTrace:
+    def __init__(self, cprofile):
+        self.started = time.perf_counter()
+        self.events = []  # (name, start, end)
+        self.sizes = {}
+        self.profiler = cProfile.Profile() if cprofile else None
+        if self.profiler:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                self.profiler = None  # another session's rerun is being profiled right now
+
+
+def _query_flag():
+    try:
+        import streamlit as st
+        return st.query_params.get("profile") not in (None, "", "0")
+    except Exception:
+        return False  # not running under Streamlit
+
+
+def begin():
+    mode = os.environ.get("P2P_PROFILE", "")
+    trace = RerunTrace(mode == "cprofile") if mode or _query_flag() else None
+    _local.trace = trace
+    return trace
+
+
+def active():
+    return getattr(_local, "trace", None) is not None
+
+
+@contextmanager
+def phase(name):
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.events.append((name, start, time.perf_counter()))
+
+
+def size(name, nbytes):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.sizes[name] = nbytes
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summary():
+    # {phase: {"last", "p50", "p95", "p99", "n"}} in ms, plus the last payload sizes.
+    with _lock:
+        table = {
+            name: {"last": values[-1], "p50": percentile(values, 0.5), "p95": percentile(values, 0.95),
+                   "p99": percentile(values, 0.99), "n": len(values)}
+            for name, values in _durations.items()
+        }
+        return table, dict(_sizes)
+
+
+def _write_trace(trace, run):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"rerun-trace-{os.getpid()}.json")
+    # JSON array format without the closing bracket: the trace viewers accept it,
+    # so each rerun only appends.
+    tid = threading.get_ident()
+    events = [{"name": f"rerun {run}", "ph": "X", "pid": os.getpid(), "tid": tid,
+               "ts": trace.started * 1e6, "dur": (trace.ended - trace.started) * 1e6, "args": trace.sizes}]
+    events += [{"name": name, "ph": "X", "pid": os.getpid(), "tid": tid, "ts": start * 1e6, "dur": (end - start) * 1e6}
+               for name, start, end in trace.events]
+    with _lock:
+        if os.path.exists(path) and os.path.getsize(path) >= TRACE_MAX_BYTES:
+            os.replace(path, os.path.join(PROFILE_DIR, f"rerun-trace-{os.getpid()}.1.json"))
+        new = not os.path.exists(path)
+        with open(path, "a", encoding="utf-8") as f:
+            if new:
+                f.write("[\n")
+            f.writelines(json.dumps(event) + ",\n" for event in events)
+    if trace.profiler:
+        trace.profiler.dump_stats(os.path.join(PROFILE_DIR, f"rerun-{os.getpid()}-{run}.prof"))
+        try:
+            os.unlink(os.path.join(PROFILE_DIR, f"rerun-{os.getpid()}-{run - ROLLING}.prof"))
+        except FileNotFoundError:
+            pass
+
+
+def end(show=True):
+    global _runs
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return None
+    _local.trace = None
+    if trace.profiler:
+        trace.profiler.disable()
+    trace.ended = time.perf_counter()
+    with _lock:
+        _runs += 1
+        run = _runs
+        _durations["total"].append((trace.ended - trace.started) * 1000)
+        for name, start, end_ in trace.events:
+            _durations[name].append((end_ - start) * 1000)
+        _sizes.update(trace.sizes)
+    _write_trace(trace, run)
+    if show:
+        _show()
+    return trace
+
+
+def _show():
+    import streamlit as st
+
+    table, sizes = summary()
+    with st.sidebar.expander("Rerun profile"):
+        st.table([{"phase": name, **{k: round(v, 3) if k != "n" else v for k, v in row.items()}}
+                  for name, row in table.items()])
+        if sizes:
+            st.caption(", ".join(f"{name}: {nbytes:,} B" for name, nbytes in sizes.items()))
+        st.caption(f"Traces in {os.path.abspath(PROFILE_DIR)}")
@@ -0,0 +1,152 @@
+# signaling_server.py
+# Local WebSocket signaling server for the P2P chat apps.
+# Run with: python signaling_server.py  (listens on ws://0.0.0.0:8765)
+#
+# Clients connect to ws://host:port/<room> and are subscribed to that room
+# straight away. Offers, answers and ICE candidates are only forwarded to the
+# other peers of the same room instead of being broadcast to every socket.
+# The latest offer of a room and its candidates are kept for OFFER_TTL seconds
+# and replayed to whoever subscribes later, so a guest that joins after the
+# host does not have to wait for a new offer. ICE-restart offers ("restart":
+# true) belong to a connection that already exists and are never cached.
+
+import asyncio
+import json
+import os
+import time
+from urllib.parse import unquote, urlsplit
+
+HOST = os.environ.get("SIGNALING_HOST", "0.0.0.0")
+PORT = int(os.environ.get("SIGNALING_PORT", "8765"))
+OFFER_TTL = float(os.environ.get("SIGNALING_OFFER_TTL", "60"))
+
+
+class RoomRouter:
+    """Room -> subscribers index. Lookups are O(peers in room), not O(all peers)."""
+
+    def __init__(self):
+        self.rooms = {}
+        self.peer_rooms = {}
+
+    def join(self, peer, room):
+        # True when the peer was not in this room yet.
+        current = self.peer_rooms.get(peer)
+        if current == room:
+            return False
+        if current is not None:
+            self.leave(peer)
+        self.rooms.setdefault(room, set()).add(peer)
+        self.peer_rooms[peer] = room
+        return True
+
+    def leave(self, peer):
+        room = self.peer_rooms.pop(peer, None)
+        if room is None:
+            return
+        peers = self.rooms[room]
+        peers.discard(peer)
+        if not peers:
+            del self.rooms[room]
+
+    def peers(self, room, exclude=None):
+        return [p for p in self.rooms.get(room, ()) if p is not exclude]
+
+
+class OfferCache:
+    """Latest offer per room plus the offerer's candidates, until answered or expired."""
+
+    def __init__(self, ttl=OFFER_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        # room -> [expires, sender, sender id, [raw messages]]; `sender` is the socket,
+        # or a peer id string in signaling_shards.py.
+        self.rooms = {}
+
+    def store(self, room, sender, data, raw):
+        kind = data.get("type")
+        entry = self.rooms.get(room)
+        if kind == "offer":
+            if data.get("restart"):
+                return
+            self.rooms[room] = [self.clock() + self.ttl, sender, data.get("from"), [raw]]
+        elif entry is None:
+            return
+        elif kind in ("candidate", "candidates") and entry[1] == sender:
+            entry[3].append(raw)
+        elif kind == "answer" and data.get("to") in (None, entry[2]):
+            # The offer has been taken; replaying it would only produce a stale answer.
+            del self.rooms[room]
+
+    def replay(self, room):
+        entry = self.rooms.get(room)
+        if entry is None:
+            return []
+        if entry[0] <= self.clock():
+            del self.rooms[room]
+            return []
+        return list(entry[3])
+
+    def forget(self, peer, room):
+        entry = self.rooms.get(room)
+        if entry is not None and entry[1] == peer:
+            del self.rooms[room]
+
+
+def room_from_path(path):
+    room = unquote(urlsplit(path).path.lstrip("/"))
+    return room or None
+
+
+router = RoomRouter()
+offers = OfferCache()
+
+
+async def subscribe(websocket, room):
+    if router.join(websocket, room):
+        for raw in offers.replay(room):
+            await websocket.send(raw)
+
+
+async def handler(websocket):
+    from websockets.asyncio.server import broadcast
+
+    room = room_from_path(websocket.request.path)
+    if room:
+        await subscribe(websocket, room)
+    try:
+        async for raw in websocket:
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            room = data.get("room")
+            if not isinstance(room, str) or not room:
+                continue
+            # Older clients only send the room inside each message.
+            await subscribe(websocket, room)
+            if data.get("type") == "join":
+                continue
+            offers.store(room, websocket, data, raw)
+            broadcast(router.peers(room, exclude=websocket), raw)
+    finally:
+        room = router.peer_rooms.get(websocket)
+        if room is not None:
+            offers.forget(websocket, room)
+        router.leave(websocket)
+
+
+async def main(host=HOST, port=PORT):
+    from websockets.asyncio.server import serve
+
+    async with serve(handler, host, port) as server:
+        print(f"Signaling server listening on ws://{host}:{port}")
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,452 @@
+# signaling_shards.py
+# Signaling tier as N worker processes on one host, same protocol as signaling_server.py.
+# Run with: python signaling_shards.py --workers 4   (kill -HUP <pid> adds a worker)
+#
+# Every worker listens on the public port with SO_REUSEPORT, so the kernel
+# spreads WebSocket connections over the workers. Each room has one owner
+# worker, picked by consistent hashing of the room name (HashRing). The owner
+# keeps the room's OfferCache and the set of workers with subscribers in the
+# room. A signaling message goes from the worker that holds the sender's socket
+# to the owner ("pub") and from the owner to every interested worker
+# ("fanout"), which delivers it to its local sockets. Workers talk over Unix
+# domain sockets, one stream per pair of workers, so messages between two
+# workers stay in order.
+#
+# Adding a worker changes the owner of about 1/N of the rooms, always to the new
+# worker. On the ring switch every old worker:
+#   1. sends each moved room's state to its new owner ("migrate");
+#   2. tells every other old worker it has switched ("flushed"). Links are FIFO,
+#      so everything it sent to an old owner under the old ring arrives first;
+#   3. once it has "flushed" from every other old worker, it has forwarded its
+#      whole old-ring backlog to the new owners (tagged "via" itself) and tells
+#      every worker it is done ("handoff").
+# A new owner applies the old owner's forwarded backlog as it arrives (the
+# migrate came first on the same link) and holds every other message for the
+# room until that handoff. Likewise every worker holds the new owner's fanouts
+# for a moved room until the old owner's handoff, which follows the old owner's
+# last fanout; fanouts carry the owner's ring size, and one from a ring the
+# worker does not have yet waits for the supervisor's "ring". Per sender,
+# messages therefore reach the owner and the subscribers in the order they were
+# sent, and established rooms keep their cached offer and subscribers.
+# Rebalances run one at a time: the supervisor asks every worker for its status
+# and refuses to add a worker until all of them are on the latest ring and done
+# handing off.
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import tempfile
+import time
+
+from signaling_server import HOST, PORT, OfferCache, RoomRouter, room_from_path
+
+VNODES = 64
+LENGTH = struct.Struct(">I")
+# Above this many unsent bytes on a link, a client's next message waits for the
+# peer worker to read. Only client handlers wait: a worker blocked inside its
+# link reader could deadlock with a peer doing the same.
+LINK_HIGH_WATER = 1024 * 1024
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Rooms -> worker index, VNODES points per worker on a 64-bit ring."""
+
+    def __init__(self, workers, vnodes=VNODES):
+        self.workers = sorted(workers)
+        points = sorted((_hash(f"worker-{w}#{v}"), w) for w in self.workers for v in range(vnodes))
+        self.points = [point for point, _ in points]
+        self.owners = [worker for _, worker in points]
+
+    def owner(self, room):
+        return self.owners[bisect.bisect(self.points, _hash(room)) % len(self.points)]
+
+
+def socket_path(run_dir, index):
+    return os.path.join(run_dir, f"worker-{index}.sock")
+
+
+def encode_message(msg):
+    body = json.dumps(msg, separators=(",", ":")).encode()
+    return LENGTH.pack(len(body)) + body
+
+
+async def read_message(reader):
+    (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    return json.loads(await reader.readexactly(size))
+
+
+class ShardWorker:
+    def __init__(self, index, run_dir, workers, previous=None):
+        self.index = index
+        self.run_dir = run_dir
+        self.ring = HashRing(workers)
+        self.previous = HashRing(previous) if previous else None
+        # Old owners whose handoff for the current ring has not arrived yet. The
+        # ring only grows, so its size numbers the rebalances; handoffs that come
+        # in before this worker got the new ring wait in `handed`.
+        self.awaiting = set(previous or ()) - {index}
+        self.handed = {}  # ring size -> workers that already handed off
+        self.flushed = {}  # ring size -> old workers that switched to that ring
+        self.handing_off = None  # ring size whose handoff this worker still owes
+        self.early = []  # fanouts sent under a ring this worker does not have yet
+        self.counter = itertools.count()
+        self.router = RoomRouter()  # local sockets by room
+        self.ids = {}  # socket -> peer id ("<worker>:<n>")
+        self.sockets = {}  # peer id -> socket
+        self.offers = OfferCache()  # rooms this worker owns
+        self.interest = {}  # owned room -> indexes of workers with subscribers
+        self.held = {}  # owned room -> messages waiting for its old owner's handoff
+        self.held_fanouts = {}  # room -> new owner's fanouts waiting for the old owner's handoff
+        self.links = {}  # worker index -> task opening the Unix connection
+        self.broadcast = None
+
+    # --- links between workers ---
+
+    @property
+    def size(self):
+        return len(self.ring.workers)
+
+    def link(self, index):
+        link = self.links.get(index)
+        if link is None:
+            link = self.links[index] = asyncio.ensure_future(
+                asyncio.open_unix_connection(socket_path(self.run_dir, index)))
+        return link
+
+    async def send_to(self, index, msg, drain=False):
+        if index == self.index:
+            return await self.dispatch(msg)
+        _, writer = await self.link(index)
+        writer.write(encode_message(msg))
+        if drain and writer.transport.get_write_buffer_size() > LINK_HIGH_WATER:
+            await writer.drain()
+
+    @property
+    def settled(self):
+        # Neither owes nor awaits a handoff: the last rebalance is over here.
+        return not self.awaiting and self.handing_off is None
+
+    async def serve_link(self, reader, writer):
+        try:
+            while True:
+                msg = await read_message(reader)
+                if msg["op"] == "status":
+                    # From the supervisor, which reads the answer on this connection.
+                    writer.write(encode_message({"ring": self.size, "settled": self.settled}))
+                else:
+                    await self.dispatch(msg)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, msg):
+        op = msg["op"]
+        if op == "fanout":
+            return self.fanout(msg)
+        if op == "replay":
+            websocket = self.sockets.get(msg["peer"])
+            for raw in msg["raws"] if websocket else ():
+                await websocket.send(raw)
+            return
+        if op == "ring":
+            return await self.rebalance(msg["workers"])
+        if op == "migrate":
+            return self.adopt(msg)
+        if op == "flushed":
+            self.flushed.setdefault(msg["ring"], set()).add(msg["worker"])
+            return await self.maybe_handoff()
+        if op == "handoff":
+            return await self.handoff_done(msg["worker"], msg["ring"])
+        # sub / unsub / left / pub: only the owner handles them.
+        room = msg["room"]
+        owner = self.ring.owner(room)
+        if owner != self.index:
+            return await self.send_to(owner, {**msg, "via": self.index})
+        if self.previous is not None:
+            old = self.previous.owner(room)
+            if old in self.awaiting and msg.get("via") != old:
+                self.held.setdefault(room, []).append(msg)
+                return
+        await self.own(msg)
+
+    async def to_owner(self, room, msg, drain=False):
+        await self.send_to(self.ring.owner(room), {**msg, "room": room}, drain=drain)
+
+    async def own(self, msg):
+        op, room = msg["op"], msg["room"]
+        if op == "pub":
+            self.offers.store(room, msg["peer"], msg["meta"], msg["raw"])
+            fanout = {"op": "fanout", "room": room, "peer": msg["peer"], "raw": msg["raw"],
+                      "ring": self.size, "owner": self.index}
+            for worker in list(self.interest.get(room, ())):
+                await self.send_to(worker, fanout)
+        elif op == "sub":
+            self.interest.setdefault(room, set()).add(msg["worker"])
+            raws = self.offers.replay(room)
+            if raws:
+                await self.send_to(msg["worker"], {"op": "replay", "peer": msg["peer"], "raws": raws})
+        elif op == "unsub":
+            workers = self.interest.get(room)
+            if workers is not None:
+                workers.discard(msg["worker"])
+                if not workers:
+                    del self.interest[room]
+        elif op == "left":
+            self.offers.forget(msg["peer"], room)
+
+    # --- rebalancing ---
+
+    async def rebalance(self, workers):
+        # Open every link first: from the switch to the last migrate nothing may
+        # yield, or a message forwarded under the new ring could beat a migrate.
+        for worker in workers:
+            if worker != self.index:
+                await self.link(worker)
+        self.previous, self.ring = self.ring, HashRing(workers)
+        self.awaiting = set(self.previous.workers) - {self.index} - self.handed.pop(len(workers), set())
+        for room in set(self.interest) | set(self.offers.rooms) | set(self.held):
+            owner = self.ring.owner(room)
+            if owner == self.index:
+                continue
+            await self.send_to(owner, {
+                "op": "migrate", "room": room, "interest": sorted(self.interest.pop(room, ())),
+                "offer": self.offers.rooms.pop(room, None), "held": self.held.pop(room, []),
+            })
+        for worker in self.previous.workers:
+            if worker != self.index:
+                await self.send_to(worker, {"op": "flushed", "worker": self.index, "ring": len(workers)})
+        self.handing_off = len(workers)
+        await self.maybe_handoff()
+        early, self.early = self.early, []
+        for msg in early:
+            self.fanout(msg)
+        await self.release()
+
+    async def maybe_handoff(self):
+        size = self.handing_off
+        if size is None or size != self.size:
+            return
+        if not set(self.previous.workers) - {self.index} <= self.flushed.get(size, set()):
+            return
+        self.flushed.pop(size, None)
+        self.handing_off = None
+        for worker in self.ring.workers:
+            if worker != self.index:
+                await self.send_to(worker, {"op": "handoff", "worker": self.index, "ring": size})
+
+    def adopt(self, msg):
+        room = msg["room"]
+        self.interest.setdefault(room, set()).update(msg["interest"])
+        if msg["offer"] is not None:
+            self.offers.rooms[room] = msg["offer"]
+        if msg["held"]:
+            self.held.setdefault(room, []).extend(msg["held"])
+
+    async def handoff_done(self, worker, ring):
+        if ring > self.size:
+            self.handed.setdefault(ring, set()).add(worker)
+            return
+        self.awaiting.discard(worker)
+        await self.release()
+
+    async def release(self):
+        ready = [room for room in self.held_fanouts if self.previous.owner(room) not in self.awaiting]
+        for room in ready:
+            for msg in self.held_fanouts.pop(room):
+                self.deliver(room, msg["raw"], msg["peer"])
+        ready = [room for room in self.held if self.previous.owner(room) not in self.awaiting]
+        for room in ready:
+            for msg in self.held.pop(room):
+                await self.dispatch(msg)
+
+    # --- local sockets ---
+
+    def fanout(self, msg):
+        if msg["ring"] > self.size:
+            self.early.append(msg)
+            return
+        room = msg["room"]
+        if self.previous is not None:
+            old = self.previous.owner(room)
+            if old in self.awaiting and msg["owner"] != old:
+                self.held_fanouts.setdefault(room, []).append(msg)
+                return
+        self.deliver(room, msg["raw"], msg["peer"])
+
+    def deliver(self, room, raw, sender):
+        peers = self.router.peers(room, exclude=self.sockets.get(sender))
+        if peers:
+            self.broadcast(peers, raw)
+
+    async def subscribe(self, websocket, room):
+        previous = self.router.peer_rooms.get(websocket)
+        if not self.router.join(websocket, room):
+            return
+        if previous is not None:
+            await self.left(websocket, previous)
+        await self.to_owner(room, {"op": "sub", "worker": self.index, "peer": self.ids[websocket]})
+
+    async def left(self, websocket, room):
+        await self.to_owner(room, {"op": "left", "peer": self.ids[websocket]})
+        if room not in self.router.rooms:
+            await self.to_owner(room, {"op": "unsub", "worker": self.index})
+
+    async def handler(self, websocket):
+        peer = f"{self.index}:{next(self.counter)}"
+        self.ids[websocket] = peer
+        self.sockets[peer] = websocket
+        try:
+            room = room_from_path(websocket.request.path)
+            if room:
+                await self.subscribe(websocket, room)
+            async for raw in websocket:
+                if isinstance(raw, bytes):
+                    raw = raw.decode(errors="replace")
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(data, dict):
+                    continue
+                room = data.get("room")
+                if not isinstance(room, str) or not room:
+                    continue
+                await self.subscribe(websocket, room)
+                if data.get("type") == "join":
+                    continue
+                meta = {key: data[key] for key in ("type", "to", "from", "restart") if key in data}
+                await self.to_owner(room, {"op": "pub", "peer": peer, "meta": meta, "raw": raw}, drain=True)
+        finally:
+            room = self.router.peer_rooms.get(websocket)
+            self.router.leave(websocket)
+            if room is not None:
+                await self.left(websocket, room)
+            del self.ids[websocket], self.sockets[peer]
+
+    async def serve(self, host=HOST, port=PORT):
+        from websockets.asyncio.server import broadcast, serve
+
+        self.broadcast = broadcast
+        path = socket_path(self.run_dir, self.index)
+        if os.path.exists(path):
+            os.unlink(path)
+        async with await asyncio.start_unix_server(self.serve_link, path):
+            async with serve(self.handler, host, port, reuse_port=True):
+                await asyncio.Future()
+
+
+def run_worker(index, run_dir, workers, previous, host, port):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor stops the workers
+    asyncio.run(ShardWorker(index, run_dir, workers, previous).serve(host, port))
+
+
+class Supervisor:
+    """Starts the workers and adds more on demand; does not touch signaling traffic."""
+
+    def __init__(self, workers, host=HOST, port=PORT, run_dir=None):
+        self.host = host
+        self.port = port
+        self.run_dir = run_dir or tempfile.mkdtemp(prefix="signaling-")
+        self.processes = []
+        self.initial = workers
+        self.adding = False
+
+    def spawn(self, index, workers, previous=None):
+        process = multiprocessing.Process(
+            target=run_worker, args=(index, self.run_dir, workers, previous, self.host, self.port), daemon=True)
+        process.start()
+        self.processes.append(process)
+        path = socket_path(self.run_dir, index)
+        deadline = time.monotonic() + 10
+        while not os.path.exists(path):
+            if time.monotonic() > deadline or not process.is_alive():
+                raise RuntimeError(f"signaling worker {index} did not start")
+            time.sleep(0.01)
+
+    def start(self):
+        workers = list(range(self.initial))
+        for index in workers:
+            self.spawn(index, workers)
+
+    def rebalancing(self):
+        # True while a worker is not on the latest ring yet or not done handing off.
+        for index in range(len(self.processes)):
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.settimeout(5)
+                sock.connect(socket_path(self.run_dir, index))
+                sock.sendall(encode_message({"op": "status"}))
+                with sock.makefile("rb") as reply:
+                    (size,) = LENGTH.unpack(reply.read(LENGTH.size))
+                    status = json.loads(reply.read(size))
+            if status["ring"] != len(self.processes) or not status["settled"]:
+                return True
+        return False
+
+    def add_worker(self):
+        # A ring that reached a worker mid-handoff would replace the state of the
+        # rebalance before it. `adding` covers a SIGHUP that lands while this runs.
+        if self.adding or self.rebalancing():
+            raise RuntimeError("the previous rebalance has not finished yet")
+        self.adding = True
+        try:
+            previous = list(range(len(self.processes)))
+            workers = previous + [len(previous)]
+            self.spawn(workers[-1], workers, previous)
+            message = encode_message({"op": "ring", "workers": workers})
+            for index in previous:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(socket_path(self.run_dir, index))
+                    sock.sendall(message)
+        finally:
+            self.adding = False
+        return len(workers)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    opts = parser.parse_args()
+
+    supervisor = Supervisor(opts.workers, opts.host, opts.port)
+    supervisor.start()
+    print(f"Signaling tier: {opts.workers} workers on ws://{opts.host}:{opts.port} (pid {os.getpid()})")
+
+    def grow(*_):
+        try:
+            print(f"{supervisor.add_worker()} workers")
+        except RuntimeError as e:
+            print(f"Not adding a worker: {e}")
+
+    signal.signal(signal.SIGHUP, grow)
+    try:
+        while True:
+            signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Reopening a ChatHistory file (chat_history.py).
+# Run from the repo root with: python -m pytest tests/
+
+from chat_history import ChatHistory
+
+
+def fill(history, start, stop):
+    for n in range(start, stop):
+        history.append("me" if n % 2 else "peer", f"m{n}")
+
+
+def texts(history, start, stop):
+    return [text for _, _, _, text in history.range(start, stop)]
+
+
+def test_reopen_carries_on_after_the_last_message(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    history = ChatHistory(path, capacity=8)
+    fill(history, 0, 20)
+    history.close()
+
+    history = ChatHistory(path, capacity=8)
+    assert len(history) == 20
+    assert [text for _, _, _, text in history.page(0, page_size=5)] == [f"m{n}" for n in range(15, 20)]
+    # Past capacity, so the reloaded ring records spill back to the file.
+    fill(history, 20, 50)
+    assert len(history) == 50
+    assert texts(history, 0, 50) == [f"m{n}" for n in range(50)]
+    history.close()
+
+    history = ChatHistory(path, capacity=8)
+    assert texts(history, 0, 50) == [f"m{n}" for n in range(50)]
+    history.close()
+
+
+def test_reopen_a_file_that_never_spilled(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    history = ChatHistory(path, capacity=8)
+    fill(history, 0, 3)
+    history.close()
+
+    history = ChatHistory(path, capacity=8)
+    assert texts(history, 0, 3) == ["m0", "m1", "m2"]
+    fill(history, 3, 12)
+    assert [seq for seq, _, _, _ in history.range(0, 12)] == list(range(12))
+    history.close()
@@ -0,0 +1,30 @@
+# Offer caching in signaling_server.py.
+# Run from the repo root with: python -m pytest tests/
+
+import json
+
+from signaling_server import OfferCache
+
+
+def store(cache, sender, **data):
+    cache.store("room", sender, data, json.dumps(data))
+
+
+def test_offer_and_candidates_are_replayed_until_answered():
+    cache = OfferCache()
+    store(cache, "host", type="offer", offer="o1")
+    store(cache, "host", type="candidate", candidate="c1")
+    store(cache, "guest", type="candidate", candidate="g1")
+    assert [json.loads(raw).get("offer") or json.loads(raw)["candidate"] for raw in cache.replay("room")] == ["o1", "c1"]
+    store(cache, "guest", type="answer")
+    assert cache.replay("room") == []
+
+
+def test_ice_restart_offers_are_not_cached():
+    cache = OfferCache()
+    store(cache, "host", type="offer", restart=True, offer="r1")
+    assert cache.replay("room") == []
+    # Nor do they replace the offer a newcomer can still answer.
+    store(cache, "host", type="offer", offer="o1")
+    store(cache, "host", type="offer", restart=True, offer="r2")
+    assert [json.loads(raw)["offer"] for raw in cache.replay("room")] == ["o1"]
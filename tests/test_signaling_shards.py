@@ -0,0 +1,205 @@
+# Rebalancing in signaling_shards.py, in one process without sockets.
+# Run from the repo root with: python -m pytest tests/
+#
+# ShardWorkers are wired together with fake links: one FIFO queue per ordered
+# pair of workers, delivered by a pump task after a random delay, like the
+# Unix-socket streams (in order per link, no order across links). Fake
+# WebSockets record what they are sent. Publishers keep sending numbered
+# messages while a worker is added and the ring update reaches the old workers
+# one by one, and every subscriber must see its room's messages complete and
+# in order.
+
+import asyncio
+import json
+import random
+import threading
+
+import pytest
+
+from signaling_shards import HashRing, ShardWorker, Supervisor, encode_message, socket_path, LENGTH
+
+ROOMS = 30
+MESSAGES = 40
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def send(self, raw):
+        self.received.append(raw)
+
+
+class FakeTransport:
+    def get_write_buffer_size(self):
+        return 0
+
+
+class FakeWriter:
+    def __init__(self, queue):
+        self.queue = queue
+        self.transport = FakeTransport()
+
+    def write(self, data):
+        # Same framing as the real links, so messages are copied like on the wire.
+        self.queue.put_nowait(json.loads(bytes(data[LENGTH.size:])))
+
+
+class FakeNet:
+    def __init__(self, seed):
+        self.rand = random.Random(seed)
+        self.workers = {}
+        self.queues = []
+        self.pumps = []
+        self.delivered = 0
+
+    def add(self, index, ring, previous=None):
+        worker = ShardWorker(index, "/nonexistent", ring, previous)
+        worker.broadcast = lambda peers, raw: [peer.received.append(raw) for peer in peers]
+        worker.link = lambda target, worker=worker: self.link(worker, target)
+        self.workers[index] = worker
+        return worker
+
+    def link(self, source, target):
+        link = source.links.get(target)
+        if link is None:
+            queue = asyncio.Queue()
+            self.queues.append(queue)
+            self.pumps.append(asyncio.ensure_future(self.pump(queue, target)))
+            link = source.links[target] = asyncio.get_running_loop().create_future()
+            link.set_result((None, FakeWriter(queue)))
+        return link
+
+    async def pump(self, queue, target):
+        while True:
+            msg = await queue.get()
+            await asyncio.sleep(self.rand.random() * 0.005)
+            await self.workers[target].dispatch(msg)
+            self.delivered += 1
+            queue.task_done()
+
+    async def settle(self):
+        # Until a pass over every link finds nothing left to deliver, including
+        # what earlier deliveries sent.
+        while True:
+            delivered = self.delivered
+            for queue in list(self.queues):
+                await asyncio.wait_for(queue.join(), 30)
+            if self.delivered == delivered:
+                return
+
+    def close(self):
+        for pump in self.pumps:
+            pump.cancel()
+
+
+async def connect(worker, room):
+    # What ShardWorker.handler does for a new WebSocket.
+    websocket = FakeSocket()
+    peer = f"{worker.index}:{next(worker.counter)}"
+    worker.ids[websocket] = peer
+    worker.sockets[peer] = websocket
+    await worker.subscribe(websocket, room)
+    return websocket, peer
+
+
+async def publish(worker, room, peer, seq):
+    raw = json.dumps({"room": room, "type": "candidate", "from": peer, "seq": seq})
+    await worker.to_owner(room, {"op": "pub", "peer": peer, "meta": {"type": "candidate"}, "raw": raw})
+
+
+async def run_rebalance(seed):
+    net = FakeNet(seed)
+    old = [0, 1, 2]
+    for index in old:
+        net.add(index, old)
+    rooms = [f"room-{r}" for r in range(ROOMS)]
+    subscribers = {}
+    publishers = {}
+    for r, room in enumerate(rooms):
+        subscribers[room] = (await connect(net.workers[r % 3], room))[0]
+        publishers[room] = (net.workers[(r + 1) % 3], (await connect(net.workers[(r + 1) % 3], room))[1])
+    await net.settle()
+
+    async def publisher(room):
+        worker, peer = publishers[room]
+        for seq in range(MESSAGES):
+            await publish(worker, room, peer, seq)
+            await asyncio.sleep(net.rand.random() * 0.002)
+
+    async def add_worker():
+        await asyncio.sleep(0.01)
+        net.add(3, old + [3], old)
+        # The supervisor reaches the old workers one at a time.
+        for index in old:
+            await net.workers[index].dispatch({"op": "ring", "workers": old + [3]})
+            # Until the last old worker switches, nobody can hand off.
+            assert not net.workers[index].settled
+            await asyncio.sleep(net.rand.random() * 0.03)
+
+    await asyncio.gather(add_worker(), *(publisher(room) for room in rooms))
+    await net.settle()
+    net.close()
+    return net, rooms, subscribers
+
+
+def test_rebalance_keeps_per_room_order():
+    for seed in range(5):
+        net, rooms, subscribers = asyncio.run(run_rebalance(seed))
+        moved = [room for room in rooms if HashRing([0, 1, 2, 3]).owner(room) == 3]
+        assert moved, "no room moved to the new worker; pick other room names"
+        for room in rooms:
+            seqs = [json.loads(raw)["seq"] for raw in subscribers[room].received]
+            assert seqs == list(range(MESSAGES)), (seed, room, seqs)
+        for worker in net.workers.values():
+            assert not (worker.held or worker.held_fanouts or worker.early), worker.index
+            assert worker.settled, worker.index
+
+
+def test_ring_moves_rooms_only_to_the_new_worker():
+    before, after = HashRing(range(4)), HashRing(range(5))
+    rooms = [f"room-{r}" for r in range(10000)]
+    moved = [room for room in rooms if before.owner(room) != after.owner(room)]
+    assert all(after.owner(room) == 4 for room in moved)
+    assert 0.1 < len(moved) / len(rooms) < 0.3
+
+
+def test_messages_round_trip_through_link_framing():
+    msg = {"op": "pub", "room": "r", "via": 3, "raw": "x"}
+    data = encode_message(msg)
+    assert LENGTH.unpack(data[:LENGTH.size])[0] == len(data) - LENGTH.size
+    assert json.loads(data[LENGTH.size:]) == msg
+
+
+def test_supervisor_adds_no_worker_until_the_rebalance_is_over(tmp_path):
+    # Two workers answering on real Unix sockets, from an event loop in a thread.
+    run_dir = str(tmp_path)
+    workers = [ShardWorker(index, run_dir, [0, 1]) for index in (0, 1)]
+    loop = asyncio.new_event_loop()
+    servers = [loop.run_until_complete(asyncio.start_unix_server(worker.serve_link, socket_path(run_dir, worker.index)))
+               for worker in workers]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        supervisor = Supervisor(2, run_dir=run_dir)
+        supervisor.processes = [None, None]  # as if start() had spawned them
+        assert not supervisor.rebalancing()
+        workers[1].handing_off = 2
+        assert supervisor.rebalancing()
+        with pytest.raises(RuntimeError, match="rebalance"):
+            supervisor.add_worker()
+        workers[1].handing_off = None
+        # A third worker exists, but the others have not got its ring yet.
+        supervisor.processes.append(None)
+        assert supervisor.rebalancing()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        for server in servers:
+            server.close()
+        # Link handlers whose connection the supervisor just closed.
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
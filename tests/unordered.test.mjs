@@ -0,0 +1,115 @@
+// Reliability layer of the unordered chat lane (p2p_component/frontend/unordered.js).
+// Run from the repo root with: node --test tests/
+//
+// Two UnorderedLinks talk over a fake channel that drops and reorders packets
+// (a fixed-seed PRNG keeps runs reproducible). Sealing is the identity, so the
+// tests cover only ids, acks, retransmission and the reorder buffer.
+
+import assert from "node:assert/strict";
+import { test } from "node:test";
+
+import { UnorderedLink } from "../p2p_component/frontend/unordered.js";
+
+function random(seed) {
+    return () => (seed = (seed * 16807) % 2147483647) / 2147483647;
+}
+
+class LossyChannel {
+    constructor(rand, loss, maxDelayMs) {
+        this.rand = rand;
+        this.loss = loss;
+        this.maxDelayMs = maxDelayMs;
+        this.readyState = "open";
+        this.peer = null;
+        this.onmessage = null;
+        this.onclose = null;
+        this.sent = 0;
+    }
+
+    send(frame) {
+        this.sent++;
+        if (this.rand() < this.loss) return;
+        const data = frame.slice().buffer;
+        // Random delays reorder packets that are in flight together.
+        setTimeout(() => this.peer.readyState === "open" && this.peer.onmessage({ data }), this.rand() * this.maxDelayMs);
+    }
+
+    close() {
+        this.readyState = this.peer.readyState = "closed";
+    }
+}
+
+function pair({ seed = 1, loss = 0, maxDelayMs = 5 } = {}) {
+    const rand = random(seed);
+    const a = new LossyChannel(rand, loss, maxDelayMs);
+    const b = new LossyChannel(rand, loss, maxDelayMs);
+    a.peer = b;
+    b.peer = a;
+    const identity = async bytes => bytes;
+    const sender = new UnorderedLink();
+    const receiver = new UnorderedLink();
+    sender.attach(a, identity, identity);
+    receiver.attach(b, identity, identity);
+    return { sender, receiver, channels: [a, b] };
+}
+
+async function deliver(sender, receiver, count, timeoutMs = 20000) {
+    const got = [];
+    const decoder = new TextDecoder();
+    receiver.onMessage = bytes => got.push(decoder.decode(bytes));
+    for (let i = 0; i < count; i++) await sender.send(new TextEncoder().encode(`m${i}`));
+    const deadline = Date.now() + timeoutMs;
+    while ((got.length < count || sender.inflight.size) && Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, 10));
+    }
+    return got;
+}
+
+const expected = count => Array.from({ length: count }, (_, i) => `m${i}`);
+
+for (const loss of [0, 0.1, 0.3]) {
+    test(`in order and exactly once at ${loss * 100}% loss`, async () => {
+        const { sender, receiver, channels } = pair({ seed: 7, loss });
+        const got = await deliver(sender, receiver, 200);
+        const { retransmits } = sender.stats;  // detach() resets the stats
+        channels[0].close();
+        sender.detach();
+        receiver.detach();
+        assert.deepEqual(got, expected(200));
+        if (loss) assert.ok(retransmits > 0);
+    });
+}
+
+test("duplicates from lost acks are not shown twice", async () => {
+    const { sender, receiver, channels } = pair({ seed: 3 });
+    // Lose every ack for a while, so the sender resends messages the receiver already has.
+    const send = channels[1].send.bind(channels[1]);
+    let dropAcks = true;
+    channels[1].send = frame => !dropAcks && send(frame);
+    setTimeout(() => (dropAcks = false), 600);
+    const got = await deliver(sender, receiver, 20);
+    const { duplicates } = receiver.stats;
+    channels[0].close();
+    sender.detach();
+    receiver.detach();
+    assert.deepEqual(got, expected(20));
+    assert.ok(duplicates > 0);
+});
+
+test("frames that fail to open or parse are counted and reported", async () => {
+    const link = new UnorderedLink();
+    const channel = { readyState: "open", send() {} };
+    link.attach(channel, async bytes => bytes, async bytes => {
+        if (bytes[0] === 0xff) throw new Error("bad tag");
+        return bytes;
+    });
+    const errors = [];
+    link.onError = kind => errors.push(kind);
+    await link.receive(new Uint8Array([0xff, 0, 0, 0, 0]));
+    await link.receive(new Uint8Array([0, 1]));  // shorter than the header
+    await link.receive(new Uint8Array([1, 0, 0, 0, 0, 0x7b]));  // ephemeral, invalid JSON
+    const { decryptFailures, malformed } = link.stats;
+    link.detach();
+    assert.deepEqual(errors, ["decrypt", "malformed", "malformed"]);
+    assert.deepEqual([decryptFailures, malformed], [1, 2]);
+});